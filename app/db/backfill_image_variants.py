@@ -0,0 +1,65 @@
+# build webp thumbnail/medium variants for applicant photos uploaded before the
+# variant pipeline existed
+#
+# usage: python -m app.db.backfill_image_variants
+#
+# safe to run more than once, media that already has variants is skipped.
+import asyncio
+from io import BytesIO
+
+from tortoise import Tortoise
+
+from app.db.init import db_uri, models
+from app.helpers.image_variants import build_image_variants_async, upload_image_variants, is_image_key
+from app.helpers.media import media_key
+from app.helpers.s3_file_upload import download_file_from_s3_async
+
+batch_size = 100
+
+
+async def backfill():
+    await Tortoise.init(db_url=db_uri, modules={'models': models})
+
+    from app.models.applicant import Applicant
+
+    created = 0
+    last_id = None
+
+    try:
+        while True:
+            queryset = Applicant.all().order_by('id').limit(batch_size)
+            if last_id is not None:
+                queryset = queryset.filter(id__gt=last_id)
+
+            rows = await queryset.values('id', 'img_url', 'photos', 'media_variants')
+            if not rows:
+                break
+
+            for row in rows:
+                media_variants = dict(row['media_variants'] or {})
+                keys = [media_key(key) for key in [row['img_url'], *(row['photos'] or [])] if key]
+
+                for key in keys:
+                    if key in media_variants or key.startswith('http') or not is_image_key(key):
+                        continue
+
+                    try:
+                        data = await download_file_from_s3_async(key)
+                        variants = await build_image_variants_async(BytesIO(data))
+                        media_variants[key] = await upload_image_variants(key, variants)
+                        created += 1
+                    except Exception as e:
+                        print(f"skipped {key}: {e}")
+
+                if media_variants != (row['media_variants'] or {}):
+                    await Applicant.filter(id=row['id']).update(media_variants=media_variants)
+
+            last_id = rows[-1]['id']
+    finally:
+        await Tortoise.close_connections()
+
+    print(f"created variants for {created} images")
+
+
+if __name__ == '__main__':
+    asyncio.run(backfill())
@@ -0,0 +1,51 @@
+# convert applicant media urls saved before media keys into bare object keys
+#
+# usage: python -m app.db.backfill_media_keys
+#
+# safe to run more than once, rows that already hold keys are left as they are.
+import asyncio
+
+from tortoise import Tortoise
+
+from app.db.init import db_uri, models
+from app.helpers.media import applicant_media_keys
+
+batch_size = 500
+
+
+async def backfill():
+    await Tortoise.init(db_url=db_uri, modules={'models': models})
+
+    from app.models.applicant import Applicant
+
+    converted = 0
+    last_id = None
+
+    try:
+        while True:
+            queryset = Applicant.all().order_by('id').limit(batch_size)
+            if last_id is not None:
+                queryset = queryset.filter(id__gt=last_id)
+
+            rows = await queryset.values('id', 'img_url', 'photos', 'qualifications_licenses')
+            if not rows:
+                break
+
+            for row in rows:
+                media = {key: row[key] for key in ('img_url', 'photos', 'qualifications_licenses')}
+                before = repr(media)
+                applicant_media_keys(media)
+
+                if repr(media) != before:
+                    await Applicant.filter(id=row['id']).update(**media)
+                    converted += 1
+
+            last_id = rows[-1]['id']
+    finally:
+        await Tortoise.close_connections()
+
+    print(f"converted media urls on {converted} applicants")
+
+
+if __name__ == '__main__':
+    asyncio.run(backfill())
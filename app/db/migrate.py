@@ -0,0 +1,49 @@
+# apply the raw sql migrations in app/db/migrations, in file name order
+#
+# usage: python -m app.db.migrate
+#
+# generate_schemas only creates missing tables, so anything that changes an
+# existing table (indexes, column types, backfills) lives here instead.
+import asyncio
+import os
+
+from tortoise import Tortoise, connections
+from tortoise.transactions import in_transaction
+
+from app.db.init import db_uri, models
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+
+async def migrate():
+    await Tortoise.init(db_url=db_uri, modules={'models': models})
+    # make sure every table exists before altering it
+    await Tortoise.generate_schemas(safe=True)
+
+    conn = connections.get('default')
+    await conn.execute_script(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "name VARCHAR(255) PRIMARY KEY, "
+        "applied_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+    )
+    applied = {row['name'] for row in await conn.execute_query_dict("SELECT name FROM schema_migrations")}
+
+    try:
+        for name in sorted(os.listdir(MIGRATIONS_DIR)):
+            if not name.endswith('.sql') or name in applied:
+                continue
+
+            with open(os.path.join(MIGRATIONS_DIR, name), encoding='utf-8') as f:
+                sql = f.read()
+
+            async with in_transaction() as tx:
+                await tx.execute_script(sql)
+                await tx.execute_query("INSERT INTO schema_migrations (name) VALUES ($1)", [name])
+
+            print(f"applied migration {name}")
+    finally:
+        await Tortoise.close_connections()
+
+
+if __name__ == '__main__':
+    asyncio.run(migrate())
@@ -0,0 +1,2 @@
+-- keyset pagination on GET /applicant/all walks (created_at, id) newest first
+CREATE INDEX IF NOT EXISTS idx_applicant_created_at_id ON applicant (created_at DESC, id DESC);
@@ -0,0 +1,31 @@
+-- structured applicant sections used to be json strings in TEXT columns,
+-- convert them to JSONB in place (fresh databases already have JSONB)
+DO $$
+DECLARE
+    col TEXT;
+BEGIN
+    FOREACH col IN ARRAY ARRAY[
+        'family', 'education', 'work_experience', 'qualifications_licenses',
+        'unique_questions', 'required_questions', 'photos'
+    ] LOOP
+        IF (SELECT data_type FROM information_schema.columns
+            WHERE table_name = 'applicant' AND column_name = col) = 'text' THEN
+            EXECUTE format(
+                'ALTER TABLE applicant ALTER COLUMN %I TYPE JSONB USING NULLIF(btrim(%I), '''')::jsonb',
+                col, col);
+        END IF;
+    END LOOP;
+END $$;
+
+-- ja_unique_questions was already JSONB but written with json.dumps, unwrap the double encoding
+UPDATE applicant
+SET ja_unique_questions = (ja_unique_questions #>> '{}')::jsonb
+WHERE jsonb_typeof(ja_unique_questions) = 'string';
+
+-- containment queries, e.g. qualifications_licenses @> '[{"name": "..."}]'
+CREATE INDEX IF NOT EXISTS idx_applicant_family_gin ON applicant USING GIN (family jsonb_path_ops);
+CREATE INDEX IF NOT EXISTS idx_applicant_education_gin ON applicant USING GIN (education jsonb_path_ops);
+CREATE INDEX IF NOT EXISTS idx_applicant_work_experience_gin ON applicant USING GIN (work_experience jsonb_path_ops);
+CREATE INDEX IF NOT EXISTS idx_applicant_qualifications_licenses_gin ON applicant USING GIN (qualifications_licenses jsonb_path_ops);
+CREATE INDEX IF NOT EXISTS idx_applicant_unique_questions_gin ON applicant USING GIN (unique_questions jsonb_path_ops);
+CREATE INDEX IF NOT EXISTS idx_applicant_required_questions_gin ON applicant USING GIN (required_questions jsonb_path_ops);
@@ -0,0 +1,16 @@
+-- server side filters on GET /applicant/all, each paired with the default
+-- (created_at, id) ordering so a filtered page is a single index range scan
+CREATE INDEX IF NOT EXISTS idx_applicant_nationality_created_at ON applicant (nationality, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_applicant_gender_created_at ON applicant (gender, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_applicant_jlpt_created_at ON applicant (jlpt, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_applicant_jft_created_at ON applicant (jft, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_applicant_visa_created_at ON applicant (visa, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_applicant_result_created_at ON applicant (result, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_applicant_recruiter_created_at ON applicant (recruiter, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_applicant_organization_created_at ON applicant (organization, created_at DESC, id DESC);
+
+-- interview_date range filter and the non-default sort keys
+CREATE INDEX IF NOT EXISTS idx_applicant_interview_date_id ON applicant (interview_date, id);
+CREATE INDEX IF NOT EXISTS idx_applicant_last_name_id ON applicant (last_name, id);
+CREATE INDEX IF NOT EXISTS idx_applicant_first_name_id ON applicant (first_name, id);
+CREATE INDEX IF NOT EXISTS idx_applicant_age_id ON applicant (age, id);
@@ -0,0 +1,28 @@
+-- full text search over the applicant free text fields (GET /applicant/search)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- english fields: weighted tsvector kept up to date by postgres itself
+ALTER TABLE applicant ADD COLUMN IF NOT EXISTS search_en tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(self_introduction, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(past_experience, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(future_career_plan, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(other_skills, '')), 'C')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_applicant_search_en ON applicant USING GIN (search_en);
+
+-- japanese fields have no word boundaries for the english parser, so they are
+-- searched by substring through a trigram index instead. pg_trgm only indexes
+-- CJK characters when the database locale is a UTF-8 one (not C/POSIX).
+-- built with || and coalesce, concat_ws is only STABLE and generated columns
+-- need an IMMUTABLE expression.
+ALTER TABLE applicant ADD COLUMN IF NOT EXISTS search_ja TEXT
+    GENERATED ALWAYS AS (
+        coalesce(ja_self_introduction, '') || ' ' ||
+        coalesce(ja_past_experience, '') || ' ' ||
+        coalesce(ja_future_career_plan, '') || ' ' ||
+        coalesce(ja_other_skills, '')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_applicant_search_ja_trgm ON applicant USING GIN (search_ja gin_trgm_ops);
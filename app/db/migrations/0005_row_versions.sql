@@ -0,0 +1,35 @@
+-- row versions for ETag / If-None-Match on the list and detail endpoints.
+-- one shared sequence keeps versions strictly increasing across every write.
+CREATE SEQUENCE IF NOT EXISTS row_version_seq;
+
+CREATE OR REPLACE FUNCTION bump_row_version() RETURNS trigger AS $$
+BEGIN
+    NEW.version := nextval('row_version_seq');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+ALTER TABLE applicant ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE companies ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE agency ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 0;
+
+UPDATE applicant SET version = nextval('row_version_seq') WHERE version = 0;
+UPDATE companies SET version = nextval('row_version_seq') WHERE version = 0;
+UPDATE agency SET version = nextval('row_version_seq') WHERE version = 0;
+
+DROP TRIGGER IF EXISTS applicant_bump_version ON applicant;
+CREATE TRIGGER applicant_bump_version BEFORE INSERT OR UPDATE ON applicant
+    FOR EACH ROW EXECUTE FUNCTION bump_row_version();
+
+DROP TRIGGER IF EXISTS companies_bump_version ON companies;
+CREATE TRIGGER companies_bump_version BEFORE INSERT OR UPDATE ON companies
+    FOR EACH ROW EXECUTE FUNCTION bump_row_version();
+
+DROP TRIGGER IF EXISTS agency_bump_version ON agency;
+CREATE TRIGGER agency_bump_version BEFORE INSERT OR UPDATE ON agency
+    FOR EACH ROW EXECUTE FUNCTION bump_row_version();
+
+-- max(version) becomes a single backward index probe
+CREATE INDEX IF NOT EXISTS idx_applicant_version ON applicant (version);
+CREATE INDEX IF NOT EXISTS idx_companies_version ON companies (version);
+CREATE INDEX IF NOT EXISTS idx_agency_version ON agency (version);
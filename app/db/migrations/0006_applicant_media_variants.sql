@@ -0,0 +1,2 @@
+-- webp thumbnail/medium renditions per original media key, see app/helpers/image_variants.py
+ALTER TABLE applicant ADD COLUMN IF NOT EXISTS media_variants JSONB;
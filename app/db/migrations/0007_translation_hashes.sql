@@ -0,0 +1,3 @@
+-- per-field source hashes so re-translation only sends changed fields to deepl
+ALTER TABLE applicant ADD COLUMN IF NOT EXISTS translation_hashes JSONB;
+ALTER TABLE translation_jobs ADD COLUMN IF NOT EXISTS force BOOLEAN NOT NULL DEFAULT FALSE;
@@ -0,0 +1,75 @@
+# ranked full text search over applicants
+#
+# search_en / search_ja are generated columns created by
+# app/db/migrations/0004_applicant_search.sql, they are not part of the tortoise model.
+#
+# snippets are html, the applicant text in them is escaped and only the <b>
+# highlight tags are markup.
+import html
+
+from tortoise import connections
+
+snippet_radius = 60
+
+en_search_sql = """
+SELECT id, first_name, last_name, img_url, created_at, rank,
+       ts_headline('english', doc, query,
+                   'StartSel=<b>, StopSel=</b>, MaxFragments=2, MaxWords=20, MinWords=5') AS snippet
+FROM (
+    SELECT a.id, a.first_name, a.last_name, a.img_url, a.created_at,
+           -- escaped before ts_headline adds the <b> tags, entities are kept whole by its parser
+           replace(replace(replace(
+               concat_ws(' ', a.self_introduction, a.past_experience, a.future_career_plan, a.other_skills),
+               '&', '&amp;'), '<', '&lt;'), '>', '&gt;') AS doc,
+           ts_rank_cd(a.search_en, q) AS rank,
+           q AS query
+    FROM applicant a, websearch_to_tsquery('english', $1) q
+    WHERE a.search_en @@ q
+    ORDER BY rank DESC, a.id
+    LIMIT $2 OFFSET $3
+) hits
+ORDER BY rank DESC, id
+"""
+
+# headlines are only built for the rows of the requested page, not for every match
+
+ja_search_sql = """
+SELECT a.id, a.first_name, a.last_name, a.img_url, a.created_at, a.search_ja AS doc,
+       word_similarity($1, a.search_ja) AS rank
+FROM applicant a
+WHERE a.search_ja ILIKE '%' || $4 || '%'
+ORDER BY rank DESC, a.id
+LIMIT $2 OFFSET $3
+"""
+
+
+def escape_like(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def highlight_snippet(doc: str, query: str) -> str:
+    # the trigram side has no ts_headline, cut a window around the first match instead
+    position = doc.lower().find(query.lower())
+    if position < 0:
+        return html.escape(doc[:snippet_radius * 2])
+
+    start = max(position - snippet_radius, 0)
+    end = min(position + len(query) + snippet_radius, len(doc))
+    match_end = position + len(query)
+
+    return (('…' if start > 0 else '') + html.escape(doc[start:position])
+            + '<b>' + html.escape(doc[position:match_end]) + '</b>'
+            + html.escape(doc[match_end:end]) + ('…' if end < len(doc) else ''))
+
+
+async def search_applicants(query: str, lang: str, limit: int, offset: int) -> list:
+    conn = connections.get('default')
+
+    if lang == 'ja':
+        rows = await conn.execute_query_dict(ja_search_sql, [query, limit, offset, escape_like(query)])
+        for row in rows:
+            row['snippet'] = highlight_snippet(row.pop('doc') or '', query)
+    else:
+        rows = await conn.execute_query_dict(en_search_sql, [query, limit, offset])
+
+    return rows
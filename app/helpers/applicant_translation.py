@@ -0,0 +1,125 @@
+# english -> japanese translation of an applicant profile, shared by the
+# synchronous /applicant/applicant_pdf_translate and the background jobs in
+# app/helpers/translation_jobs.py
+from app.models.applicant import Applicant, applicant_pydantic
+from app.helpers.cache import response_cache
+from app.helpers.media import resolve_applicant_media
+from app.helpers.translator import translator
+from app.helpers.translation_memory import source_hash
+
+# Fields to translate
+fields_to_translate = [
+    "first_name", "last_name", "middle_name", "other_skills",
+    "self_introduction", "reason_for_application",
+    "past_experience", "future_career_plan"
+]
+
+
+def unique_question_key(question: dict, index: int) -> str:
+    return f"unique_questions.{question.get('id', index)}"
+
+
+async def translate_applicant(applicant_id, unique_questions, progress=None, force=False) -> dict:
+    """
+    Translate the applicant's profile fields and the given unique_questions answers,
+    save them to the ja_* fields and return the bilingual applicant payload.
+    Fields whose source text is unchanged since the last run keep their translation
+    unless `force` is set, which also bypasses the translation memory. `progress(completed, total)` is awaited as source strings
+    are translated.
+    """
+    applicant = await Applicant.get(id=applicant_id)
+
+    # source hash per field from the previous run, e.g. {"self_introduction": ..., "unique_questions.2": ...}
+    hashes = {} if force else dict(applicant.translation_hashes or {})
+
+    # previous answer translations, to keep the ones whose source didn't change
+    previous_answers = {
+        unique_question_key(question, index): question.get("answer")
+        for index, question in enumerate(applicant.ja_unique_questions or [])
+        if isinstance(question, dict)
+    }
+
+    # every changed non-empty source string goes to deepl in one batched call,
+    # targets remembers where each translation belongs
+    sources = []
+    targets = []
+
+    for field in fields_to_translate:
+        original_text = getattr(applicant, field)
+        if original_text:
+            digest = source_hash(original_text)
+            if hashes.get(field) == digest and getattr(applicant, f"ja_{field}"):
+                continue
+            sources.append(original_text)
+            targets.append((f"ja_{field}", None, field, digest))
+
+    # Special handling for unique_questions
+    unique_questions = unique_questions or []
+    for index, question in enumerate(unique_questions):
+        answer = question.get("answer")
+        if answer:
+            key = unique_question_key(question, index)
+            digest = source_hash(answer)
+            if hashes.get(key) == digest and previous_answers.get(key):
+                question["answer"] = previous_answers[key]
+                continue
+            sources.append(answer)
+            targets.append(("unique_questions", index, key, digest))
+
+    if progress is not None:
+        await progress(0, len(sources))
+
+    translations = await translator.translate_many(
+        sources, target_lang="JA", use_memory=not force) if sources else []
+
+    if progress is not None:
+        await progress(len(sources), len(sources))
+
+    for (field, index, key, digest), translated_text in zip(targets, translations):
+        if field == "unique_questions":
+            unique_questions[index]["answer"] = translated_text
+        else:
+            setattr(applicant, field, translated_text)
+        hashes[key] = digest
+
+    setattr(applicant, "ja_unique_questions", unique_questions)
+    setattr(applicant, "translation_hashes", hashes)
+    setattr(applicant, "is_translated", True)
+
+    await applicant.save()
+
+    await response_cache.invalidate('applicant')
+
+    return await bilingual_applicant_payload(applicant)
+
+
+async def bilingual_applicant_payload(applicant: Applicant) -> dict:
+    # get the new applicant data
+    new_applicant = await applicant_pydantic.from_tortoise_orm(applicant)
+
+    applicant_dict = new_applicant.model_dump()
+
+    has_family = applicant_dict['family'] is not None and len(
+        applicant_dict['family']) > 0
+
+    if applicant_dict.get('required_questions'):
+        # on applicant_dict['unique_questions'] add has_family
+        # New question to be inserted
+        new_question = {
+            "id": "4",
+            "question": "日本に友人、知人、親戚がいますか？ (Do you have friends, family/relatives living in Japan?)",
+            "answer": "yes" if has_family else "none"
+        }
+
+        # Insert the new question at the fourth position
+        # Insert at index 3, which is the fourth position
+        applicant_dict['required_questions'].insert(3, new_question)
+
+        # Update the IDs of the subsequent questions
+        # Start from index 4 since we inserted at index 3
+        for i in range(4, len(applicant_dict['required_questions'])):
+            applicant_dict['required_questions'][i]['id'] = str(
+                int(applicant_dict['required_questions'][i]['id']) + 1)  # Increment IDs by 1
+
+    # stored object keys -> cdn urls
+    return resolve_applicant_media(applicant_dict)
@@ -0,0 +1,65 @@
+import os
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.config import Config
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# one boto3 session and one client per (service, region) for the whole process.
+# clients are created on first use and kept across warm lambda invocations, so
+# requests reuse pooled keep-alive connections instead of new tls handshakes.
+
+client_config = Config(
+    max_pool_connections=int(os.getenv("AWS_MAX_POOL_CONNECTIONS", "50")),
+    tcp_keepalive=True,
+    connect_timeout=int(os.getenv("AWS_CONNECT_TIMEOUT", "5")),
+    read_timeout=int(os.getenv("AWS_READ_TIMEOUT", "60")),
+    retries={
+        "max_attempts": int(os.getenv("AWS_MAX_ATTEMPTS", "5")),
+        "mode": "standard",
+    },
+)
+
+# boto3 blocks, so async handlers run every aws call on these threads
+# instead of the event loop. sized for calls in flight, not cpu.
+aws_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("STORAGE_MAX_WORKERS", "16")), thread_name_prefix="aws")
+
+_session = None
+_clients = {}
+# boto3 sessions are not thread safe, client creation happens under this lock
+_lock = threading.Lock()
+
+
+def get_session():
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = boto3.Session(
+                    aws_access_key_id=os.environ["AWS_ACCESS_KEYID"],
+                    aws_secret_access_key=os.environ["AWS_SECRET_ACCESSKEY"])
+    return _session
+
+
+def get_client(service_name, region_name=None):
+    key = (service_name, region_name)
+    client = _clients.get(key)
+    if client is None:
+        session = get_session()
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = session.client(service_name, region_name=region_name, config=client_config)
+                _clients[key] = client
+    return client
+
+
+async def run_in_aws_executor(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(aws_executor, functools.partial(func, *args, **kwargs))
@@ -0,0 +1,196 @@
+# response cache for read-mostly endpoints
+#
+# every entry is tagged with the entities it was built from (company, agency,
+# applicant). writes call invalidate(tag) which bumps the tag version, entries
+# built under an older version are simply never looked up again and age out.
+#
+# the in-process LRU always sits in front. CACHE_BACKEND=redis adds a shared
+# store (CACHE_REDIS_URL) so warm lambdas see each other's entries and
+# invalidations, CACHE_BACKEND=local uses an in-process stand-in with the same
+# interface for development.
+#
+# entries are the serialized json body, a hit is returned as-is without
+# touching the encoder again.
+import os
+import time
+from collections import OrderedDict
+
+import orjson
+from dotenv import load_dotenv
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+
+load_dotenv()
+
+cache_ttl = int(os.getenv("CACHE_TTL_SECONDS", "60"))
+cache_max_entries = int(os.getenv("CACHE_MAX_ENTRIES", "512"))
+
+
+class LRUCache:
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return False, None
+
+        self._entries.move_to_end(key)
+        return True, value
+
+    def set(self, key, value, ttl=None):
+        self._entries[key] = (time.monotonic() + (ttl or self.ttl), value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class LocalBackend:
+    # stand-in for the shared backend, same async interface but lives in this process
+    def __init__(self):
+        self._values = {}
+
+    async def get(self, key):
+        entry = self._values.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            del self._values[key]
+            return None
+
+        return value
+
+    async def get_many(self, keys):
+        return [await self.get(key) for key in keys]
+
+    async def set(self, key, value, ttl=None):
+        self._values[key] = (time.monotonic() + ttl if ttl else None, value)
+
+    async def incr(self, key):
+        value = int(await self.get(key) or 0) + 1
+        await self.set(key, str(value))
+        return value
+
+
+class RedisBackend:
+    def __init__(self, url: str):
+        # optional dependency, only needed when CACHE_BACKEND=redis
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+
+    async def get(self, key):
+        return await self._redis.get(key)
+
+    async def get_many(self, keys):
+        return await self._redis.mget(keys)
+
+    async def set(self, key, value, ttl=None):
+        await self._redis.set(key, value, ex=ttl)
+
+    async def incr(self, key):
+        return await self._redis.incr(key)
+
+
+class ResponseCache:
+    def __init__(self, maxsize: int = 512, ttl: int = 60, backend=None):
+        self.local = LRUCache(maxsize, ttl)
+        self.backend = backend
+        self.ttl = ttl
+        self._tag_versions = {}
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    async def _versions(self, tags):
+        if self.backend is None:
+            return [self._tag_versions.get(tag, 0) for tag in tags]
+
+        versions = await self.backend.get_many([f"tag:{tag}" for tag in tags])
+        return [int(version or 0) for version in versions]
+
+    async def get_or_set(self, key: str, tags, loader, ttl=None):
+        versions = await self._versions(tags)
+        versioned_key = key + '|' + ','.join(f"{tag}:{version}" for tag, version in zip(tags, versions))
+
+        found, value = self.local.get(versioned_key)
+        if found:
+            self.hits += 1
+            return value
+
+        if self.backend is not None:
+            value = await self.backend.get(versioned_key)
+            if value is not None:
+                self.local.set(versioned_key, value, ttl)
+                self.hits += 1
+                self.shared_hits += 1
+                return value
+
+        self.misses += 1
+
+        value = dump_json(await loader())
+        self.local.set(versioned_key, value, ttl)
+
+        if self.backend is not None:
+            await self.backend.set(versioned_key, value, ttl or self.ttl)
+
+        return value
+
+    async def invalidate(self, *tags):
+        for tag in tags:
+            if self.backend is None:
+                self._tag_versions[tag] = self._tag_versions.get(tag, 0) + 1
+            else:
+                await self.backend.incr(f"tag:{tag}")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "local_entries": len(self.local),
+            "backend": type(self.backend).__name__ if self.backend else None,
+        }
+
+
+def dump_json(value) -> bytes:
+    # orjson handles dicts from .values() natively (uuid, date, datetime),
+    # pydantic models and anything else exotic fall back to fastapi's encoder
+    return orjson.dumps(value, default=jsonable_encoder)
+
+
+async def cached_json_response(key: str, tags, loader, ttl=None) -> Response:
+    body = await response_cache.get_or_set(key, tags, loader, ttl)
+    return Response(content=body, media_type="application/json")
+
+
+def create_backend():
+    backend = os.getenv("CACHE_BACKEND", "").lower()
+
+    if backend == "redis":
+        return RedisBackend(os.environ["CACHE_REDIS_URL"])
+    if backend == "local":
+        return LocalBackend()
+
+    return None
+
+
+response_cache = ResponseCache(cache_max_entries, cache_ttl, create_backend())
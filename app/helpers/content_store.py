@@ -0,0 +1,110 @@
+import asyncio
+import hashlib
+import logging
+import mimetypes
+import os
+
+from app.helpers.s3_file_upload import run_in_storage_executor, upload_file_to_s3, upload_concurrency
+from app.models.stored_object import StoredObject
+
+# uploads are stored under the sha256 of their content, so re-sending an unchanged
+# file maps to the key it already has and two different files never collide.
+# stored_objects remembers which keys are in the bucket, no HEAD request needed.
+#
+# a key is indexed only once a row referencing it is saved (index_stored_files),
+# so dedup never hands out an object nobody points to. a key is shared by every
+# row that uploaded the same content, so nothing here deletes objects. files
+# left over from a failed save have no index row, a lifecycle rule or sweeper
+# can remove them after checking no applicant or interviewee row references them.
+
+logger = logging.getLogger(__name__)
+
+hash_chunk_size = 1024 * 1024
+
+
+def hash_file(fileobj):
+    # reads the spooled upload in chunks, never the whole file at once
+    fileobj.seek(0)
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: fileobj.read(hash_chunk_size), b''):
+        digest.update(chunk)
+        size += len(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest(), size
+
+
+def file_extension(filename, content_type):
+    extension = os.path.splitext(filename or '')[1].lower()
+    if not extension and content_type:
+        extension = mimetypes.guess_extension(content_type) or ''
+    return extension
+
+
+def content_key(folder_path, sha256, extension):
+    return f'{folder_path}{sha256}{extension}'
+
+
+async def store_file_async(file_object, folder_path, prepare=None):
+    """
+    Store an UploadFile under its content hash. Returns (key, entry), entry is the
+    unsaved StoredObject for index_stored_files, None when the same content was
+    already indexed and the upload was skipped.
+    `prepare(file_object, key)` is awaited once the key is known, while the file is still open.
+    """
+    sha256, size = await run_in_storage_executor(hash_file, file_object.file)
+    key = content_key(folder_path, sha256, file_extension(file_object.filename, file_object.content_type))
+
+    if prepare is not None:
+        await prepare(file_object, key)
+
+    if await StoredObject.exists(key=key):
+        file_object.file.close()
+        return key, None
+
+    # a concurrent request may upload the same content too, the object is identical
+    await run_in_storage_executor(upload_file_to_s3, file_object, key[len(folder_path):], folder_path)
+
+    return key, StoredObject(key=key, sha256=sha256, size=size, content_type=file_object.content_type)
+
+
+async def index_stored_files(entries):
+    """
+    Record the objects from store_files_async once the row referencing them is saved.
+    """
+    # the same content twice in one request gives two entries for one key
+    entries = list({entry.key: entry for entry in entries if entry is not None}.values())
+    if entries:
+        await StoredObject.bulk_create(entries, ignore_conflicts=True)
+
+
+async def store_files_async(uploads, concurrency=None, prepare=None):
+    """
+    Store (file_object, folder_path) pairs in parallel, at most `concurrency` at a
+    time, `prepare` runs inside that limit. Returns (keys, entries) in the same order
+    as `uploads`, entries go to index_stored_files after the referencing row is saved.
+    If any upload fails the rest are cancelled and the error is raised. Objects
+    already uploaded are kept and left unindexed.
+    """
+    semaphore = asyncio.Semaphore(concurrency or upload_concurrency)
+
+    async def store_one(file_object, folder_path):
+        async with semaphore:
+            return await store_file_async(file_object, folder_path, prepare)
+
+    tasks = [asyncio.ensure_future(store_one(*upload)) for upload in uploads]
+
+    try:
+        results = await asyncio.gather(*tasks)
+        return [key for key, _ in results], [entry for _, entry in results]
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        created = [task.result()[0] for task in tasks
+                   if task.done() and not task.cancelled() and task.exception() is None and task.result()[1] is not None]
+        if created:
+            logger.warning(f"Upload failed, left unreferenced objects: {', '.join(created)}")
+
+        raise
@@ -0,0 +1,62 @@
+# conditional GET support
+#
+# applicant, companies and agency rows carry a version that a postgres trigger
+# bumps from one shared sequence on every insert/update (migration 0005). the
+# max version plus the row count of a queryset changes whenever any row in it
+# is added, edited or deleted, so it is enough to tell whether a list changed
+# without loading it.
+#
+# a database built by generate_schemas alone has no trigger and every version
+# stays 0. versions can't tell edits apart there, so no etag is sent at all.
+import hashlib
+
+from fastapi import Request, Response
+
+from app.helpers.cache import cached_json_response
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return f'"{digest}"'
+
+
+async def collection_etag(queryset, *parts):
+    # None when the rows carry no versions (migration 0005 not applied)
+    latest = await queryset.order_by('-version').first().values_list('version', flat=True)
+    if latest == 0:
+        return None
+
+    total = await queryset.count()
+
+    return make_etag(*parts, latest, total)
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+
+    if header.strip() == '*':
+        return True
+
+    return etag in (tag.strip().removeprefix('W/') for tag in header.split(','))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={'ETag': etag})
+
+
+async def conditional_json_response(request: Request, key: str, tags, queryset, loader) -> Response:
+    # 304 from one cheap aggregate query when the client is up to date,
+    # otherwise the (cached) body, keyed by the etag so it can never be staler than the db
+    etag = await collection_etag(queryset, key)
+    if etag is None:
+        return await cached_json_response(key, tags, loader)
+
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    response = await cached_json_response(f'{key}:{etag}', tags, loader)
+    response.headers['ETag'] = etag
+
+    return response
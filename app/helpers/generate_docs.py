@@ -1,9 +1,9 @@
 import os
-import boto3
 import shutil
 from dotenv import load_dotenv
 from datetime import datetime
 from app.helpers.s3_file_upload import generate_s3_url
+from app.helpers.storage import storage
 from tempfile import TemporaryDirectory
 from io import BytesIO
 from docx import Document
@@ -17,9 +17,6 @@ import xlwings as xw
 
 load_dotenv()
 
-# Initialize S3 client
-s3 = boto3.client('s3')
-
 # Define the directory for static files (relative to the current working directory)
 STATIC_DIR = "app/static"
 
@@ -137,8 +134,7 @@ def fill_application_form(company, agency, details):
         with open(temp_file_path, 'rb') as temp_file:
             new_contract_buffer.write(temp_file.read())
 
-        s3.upload_file(temp_file_path, Bucket=bucket_name, Key=s3_new_document, ExtraArgs={
-            'ACL': 'public-read', 'ContentType': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'})
+        storage.upload_file(temp_file_path, s3_new_document, 'application/vnd.openxmlformats-officedocument.wordprocessingml.document')
 
     s3_read_url = generate_s3_url(s3_new_document, 'read')
     return s3_read_url
@@ -248,8 +244,7 @@ def fill_manpower_request_form(company, agency, details):
         with open(temp_file_path, 'rb') as temp_file:
             new_contract_buffer.write(temp_file.read())
 
-        s3.upload_file(temp_file_path, Bucket=bucket_name, Key=s3_new_document, ExtraArgs={
-            'ACL': 'public-read', 'ContentType': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'})
+        storage.upload_file(temp_file_path, s3_new_document, 'application/vnd.openxmlformats-officedocument.wordprocessingml.document')
 
     s3_read_url = generate_s3_url(s3_new_document, 'read')
     return s3_read_url
@@ -357,8 +352,7 @@ def fill_employment_contract(company, agency, details):
         with open(temp_file_path, 'rb') as temp_file:
             new_contract_buffer.write(temp_file.read())
 
-        s3.upload_file(temp_file_path, Bucket=bucket_name, Key=s3_new_document, ExtraArgs={
-            'ACL': 'public-read', 'ContentType': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'})
+        storage.upload_file(temp_file_path, s3_new_document, 'application/vnd.openxmlformats-officedocument.wordprocessingml.document')
 
     s3_read_url = generate_s3_url(s3_new_document, 'read')
     return s3_read_url
@@ -424,8 +418,7 @@ def fill_recruitment_agreement(company, agency, details):
         with open(temp_file_path, 'rb') as temp_file:
             new_contract_buffer.write(temp_file.read())
 
-        s3.upload_file(temp_file_path, Bucket=bucket_name, Key=s3_new_document, ExtraArgs={
-            'ACL': 'public-read', 'ContentType': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'})
+        storage.upload_file(temp_file_path, s3_new_document, 'application/vnd.openxmlformats-officedocument.wordprocessingml.document')
 
     s3_read_url = generate_s3_url(s3_new_document, 'read')
     return s3_read_url
@@ -493,8 +486,7 @@ def fill_ssw_company_profile(company, agency, details):
         with open(temp_file_path, 'rb') as temp_file:
             new_contract_buffer.write(temp_file.read())
 
-        s3.upload_file(temp_file_path, Bucket=bucket_name, Key=s3_new_document, ExtraArgs={
-            'ACL': 'public-read', 'ContentType': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'})
+        storage.upload_file(temp_file_path, s3_new_document, 'application/vnd.openxmlformats-officedocument.wordprocessingml.document')
 
     s3_read_url = generate_s3_url(s3_new_document, 'read')
     return s3_read_url
@@ -651,8 +643,7 @@ def fill_ssw_list_task_duties(company, agency, details):
         with open(temp_file_path, 'rb') as temp_file:
             new_contract_buffer.write(temp_file.read())
 
-        s3.upload_file(temp_file_path, Bucket=bucket_name, Key=s3_new_document, ExtraArgs={
-            'ACL': 'public-read', 'ContentType': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'})
+        storage.upload_file(temp_file_path, s3_new_document, 'application/vnd.openxmlformats-officedocument.wordprocessingml.document')
 
     s3_read_url = generate_s3_url(s3_new_document, 'read')
     return s3_read_url
@@ -670,8 +661,7 @@ def generate_default_documents(document_name: str, application_type: str):
             s3_new_document = f"{contracts_folder}{new_document_name}"
 
             with open(original_file, 'rb') as file:
-                s3.upload_fileobj(file, bucket_name, s3_new_document, ExtraArgs={
-                    'ACL': 'public-read', 'ContentType': 'application/pdf'})
+                storage.upload_fileobj(file, s3_new_document, 'application/pdf')
 
             s3_read_url = generate_s3_url(s3_new_document, 'read')
 
@@ -684,8 +674,7 @@ def generate_default_documents(document_name: str, application_type: str):
             s3_new_document = f"{contracts_folder}{new_document_name}"
 
             with open(original_file, 'rb') as file:
-                s3.upload_fileobj(file, bucket_name, s3_new_document, ExtraArgs={
-                    'ACL': 'public-read', 'ContentType': 'application/pdf'})
+                storage.upload_fileobj(file, s3_new_document, 'application/pdf')
 
             s3_read_url = generate_s3_url(s3_new_document, 'read')
 
@@ -700,8 +689,7 @@ def generate_default_documents(document_name: str, application_type: str):
 
             # upload file to s3
             with open(original_file, 'rb') as file:
-                s3.upload_fileobj(file, bucket_name, s3_new_document, ExtraArgs={
-                    'ACL': 'public-read', 'ContentType': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'})
+                storage.upload_fileobj(file, s3_new_document, 'application/vnd.openxmlformats-officedocument.wordprocessingml.document')
 
             s3_read_url = generate_s3_url(s3_new_document, 'read')
 
@@ -716,8 +704,7 @@ def generate_default_documents(document_name: str, application_type: str):
 
             with open(original_file, 'rb') as file:
                 # upload using upload_file, this is not pdf, it is docx
-                s3.upload_fileobj(file, bucket_name, s3_new_document, ExtraArgs={
-                    'ACL': 'public-read', 'ContentType': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'})
+                storage.upload_fileobj(file, s3_new_document, 'application/vnd.openxmlformats-officedocument.wordprocessingml.document')
 
             s3_read_url = generate_s3_url(s3_new_document, 'read')
 
@@ -846,10 +833,8 @@ def generate_letter_pack(details, sheet_configs):
     app.quit()
 
     # Upload the modified workbook directly to S3
-    s3 = boto3.client('s3')
     with open(document_path, 'rb') as file:
-        s3.upload_fileobj(file, bucket_name, f"{contracts_folder}レターパック宛先.xlsx", ExtraArgs={
-            'ACL': 'public-read', 'ContentType': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'})
+        storage.upload_fileobj(file, f"{contracts_folder}レターパック宛先.xlsx", 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
 
     s3_read_url = generate_s3_url(f"{contracts_folder}レターパック宛先.xlsx", 'read')
 
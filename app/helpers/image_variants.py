@@ -0,0 +1,72 @@
+# derived webp renditions of applicant photos
+#
+# the original upload is kept untouched, next to it go <name>_thumb.webp and
+# <name>_medium.webp. variants are auto-oriented from the exif orientation
+# tag and written without any exif (no camera / gps metadata).
+import asyncio
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+from app.helpers.s3_file_upload import run_in_storage_executor, upload_bytes_to_s3_async, is_file_exists_async
+
+# longest edge in pixels
+variant_sizes = {
+    "thumb": 320,
+    "medium": 1280,
+}
+
+webp_quality = 80
+
+image_extensions = ('jpg', 'jpeg', 'png', 'webp', 'heic')
+
+
+def is_image_key(key: str) -> bool:
+    return '.' in key and key.rsplit('.', 1)[-1].lower() in image_extensions
+
+
+def variant_key(key: str, name: str) -> str:
+    return f"{key.rsplit('.', 1)[0]}_{name}.webp"
+
+
+def build_image_variants(fileobj) -> dict:
+    fileobj.seek(0)
+
+    with Image.open(fileobj) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+        variants = {}
+        for name, size in variant_sizes.items():
+            resized = image.copy()
+            resized.thumbnail((size, size), Image.LANCZOS)
+
+            buffer = BytesIO()
+            resized.save(buffer, 'WEBP', quality=webp_quality, method=4, exif=b'')
+            variants[name] = buffer.getvalue()
+
+    fileobj.seek(0)
+    return variants
+
+
+async def build_image_variants_async(fileobj) -> dict:
+    return await run_in_storage_executor(build_image_variants, fileobj)
+
+
+async def upload_image_variants(key: str, variants: dict) -> dict:
+    # returns {"thumb": key, "medium": key} for the applicant's media_variants
+    variant_keys = {name: variant_key(key, name) for name in variants}
+
+    for name, data in variants.items():
+        await upload_bytes_to_s3_async(data, variant_keys[name], 'image/webp')
+
+    return variant_keys
+
+
+async def existing_image_variants(key: str):
+    # renditions are named after the original's key, the same content uploaded
+    # again finds the ones built the first time. None when any is missing
+    variant_keys = {name: variant_key(key, name) for name in variant_sizes}
+    found = await asyncio.gather(*(is_file_exists_async(variant) for variant in variant_keys.values()))
+    return variant_keys if all(found) else None
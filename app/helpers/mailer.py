@@ -7,16 +7,11 @@ import os
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from dotenv import load_dotenv
-import boto3
 
-from concurrent.futures import ThreadPoolExecutor
-import asyncio
+from app.helpers.aws import get_client, run_in_aws_executor
 
 load_dotenv()
 
-access_key = os.environ["AWS_ACCESS_KEYID"]
-secret_access_key = os.environ["AWS_SECRET_ACCESSKEY"]
-
 
 class EmailSchema(BaseModel):
     email: List[EmailStr]
@@ -42,12 +37,8 @@ class Mailer:
         )
 
     async def send_sms(self, phone_number: str, message: str):
-        sns_session = boto3.Session(
-            aws_access_key_id=access_key,
-            aws_secret_access_key=secret_access_key,
-            region_name="ap-northeast-1"
-        )
-        sns_client = sns_session.client("sns")
+        # pooled client and shared thread pool, see app/helpers/aws.py
+        sns_client = get_client("sns", region_name="ap-northeast-1")
 
         # Define a function to run the blocking operation in a thread
         def publish_sms():
@@ -62,11 +53,7 @@ class Mailer:
                 }
             )
 
-        # Use ThreadPoolExecutor to execute the blocking function asynchronously
-        loop = asyncio.get_running_loop()
-        with ThreadPoolExecutor() as pool:
-            response = await loop.run_in_executor(pool, publish_sms)
-            return response
+        return await run_in_aws_executor(publish_sms)
 
         # # check if the message was sent
         # return {"message": "SMS sent successfully"}
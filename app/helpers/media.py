@@ -0,0 +1,118 @@
+# applicant media is stored as bare object keys (uploads/applicant/photos/...),
+# public urls are built from MEDIA_CDN_ORIGIN when a row is serialized
+import os
+import re
+from urllib.parse import quote, unquote
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+media_cdn_origin = os.getenv(
+    "MEDIA_CDN_ORIGIN", "https://d1l1wfoqw8757j.cloudfront.net/").rstrip('/') + '/'
+
+bucket_name = os.getenv("AWS_STORAGE_BUCKET_NAME", "fjl-bucket")
+
+# origins older rows were saved with, the stored path after these is url encoded
+legacy_origins = (
+    f"https://{bucket_name}.s3.amazonaws.com/",
+    "https://fjl-bucket.s3.amazonaws.com/",
+    "https://d1l1wfoqw8757j.cloudfront.net/",
+    media_cdn_origin,
+)
+
+
+def media_url(key):
+    if not key:
+        return key
+
+    if key.startswith(('http://', 'https://')):
+        # not converted by the media key backfill yet
+        for origin in legacy_origins:
+            if key.startswith(origin):
+                return media_cdn_origin + key[len(origin):]
+        return key
+
+    return media_cdn_origin + quote(key)
+
+
+def media_key(value):
+    # inverse of media_url, clients send back the urls they were given
+    if not value or not value.startswith(('http://', 'https://')):
+        return value
+
+    for origin in legacy_origins:
+        if value.startswith(origin):
+            return unquote(value[len(origin):].split('?')[0])
+
+    return value
+
+
+# img_<variant>_url and photo_<variant>s, added to responses by resolve_applicant_media
+derived_media_field = re.compile(r'img_[a-z]+_url|photo_[a-z]+s')
+
+
+def resolve_applicant_media(applicant_dict: dict, variant: str = None) -> dict:
+    # img_url and photos always stay the originals, admin edits send them back.
+    # variant="thumb"/"medium" adds img_<variant>_url and photo_<variant>s with the
+    # webp rendition where one exists and the original otherwise
+    media_variants = applicant_dict.get('media_variants') or {}
+
+    def rendition(key):
+        return media_url((media_variants.get(key) or {}).get(variant, key))
+
+    if variant and 'img_url' in applicant_dict:
+        applicant_dict[f'img_{variant}_url'] = rendition(applicant_dict['img_url'])
+
+    if variant and 'photos' in applicant_dict:
+        applicant_dict[f'photo_{variant}s'] = [rendition(photo) for photo in applicant_dict['photos'] or []]
+
+    if applicant_dict.get('img_url'):
+        applicant_dict['img_url'] = media_url(applicant_dict['img_url'])
+
+    if applicant_dict.get('photos'):
+        applicant_dict['photos'] = [media_url(photo) for photo in applicant_dict['photos']]
+
+    if media_variants:
+        applicant_dict['media_variants'] = {
+            media_url(key): {name: media_url(value) for name, value in renditions.items()}
+            for key, renditions in media_variants.items()
+        }
+
+    for license in applicant_dict.get('qualifications_licenses') or []:
+        if isinstance(license, dict) and isinstance(license.get('file'), str):
+            license['file'] = media_url(license['file'])
+
+    return applicant_dict
+
+
+def applicant_media_keys(details: dict, media_variants: dict = None) -> dict:
+    # normalize whatever media values a write carries back to keys. a rendition
+    # sent back in place of its original (clients built before img_<variant>_url)
+    # is mapped back to the original through the row's media_variants
+    originals = {
+        rendition: key
+        for key, renditions in (media_variants or {}).items()
+        for rendition in renditions.values()
+    }
+
+    def original_key(value):
+        key = media_key(value)
+        return originals.get(key, key)
+
+    # a row from /all sent back as is carries the derived rendition fields, they aren't columns
+    for field in [field for field in details if derived_media_field.fullmatch(field)]:
+        del details[field]
+
+    if isinstance(details.get('img_url'), str):
+        details['img_url'] = original_key(details['img_url'])
+
+    if isinstance(details.get('photos'), list):
+        details['photos'] = [original_key(photo) if isinstance(photo, str) else photo
+                             for photo in details['photos']]
+
+    for license in details.get('qualifications_licenses') or []:
+        if isinstance(license, dict) and isinstance(license.get('file'), str):
+            license['file'] = media_key(license['file'])
+
+    return details
@@ -0,0 +1,53 @@
+# keyset (cursor) pagination helpers
+#
+# a cursor is the sort key of the last row of a page, base64 encoded so the
+# client can pass it back untouched to fetch the next page.
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+from fastapi import HTTPException
+from tortoise.expressions import Q
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps(values, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, binascii.Error, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+    if not isinstance(values, list):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+    return values
+
+
+def split_page(rows: list, limit: int):
+    # rows are fetched with limit + 1, the extra row only tells us there is a next page
+    return rows[:limit], len(rows) > limit
+
+
+def cursor_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def keyset_filter(field: str, value, pk, descending: bool) -> Q:
+    # rows strictly after (value, pk) in "ORDER BY field, id" order. postgres sorts
+    # NULLs last ascending and first descending, so nullable sort keys need the extra branches
+    if descending:
+        if value is None:
+            return Q(**{f'{field}__isnull': True, 'id__lt': pk}) | Q(**{f'{field}__isnull': False})
+        return Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk})
+
+    if value is None:
+        return Q(**{f'{field}__isnull': True, 'id__gt': pk})
+    return Q(**{f'{field}__gt': value}) | Q(**{field: value, 'id__gt': pk}) | Q(**{f'{field}__isnull': True})
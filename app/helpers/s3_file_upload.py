@@ -1,27 +1,28 @@
 import os
-import boto3
 import shutil
 import time
+import asyncio
+import functools
 from dotenv import load_dotenv
 from botocore.exceptions import ClientError, NoCredentialsError
 from app.helpers.definitions import get_directory_path
-from tempfile import NamedTemporaryFile
+from app.helpers.aws import aws_executor
+from app.helpers.storage import storage, PresignUnsupported
 from fastapi import UploadFile
 import datetime
 
 load_dotenv()
 
-access_key = os.environ["AWS_ACCESS_KEYID"]
-secret_access_key = os.environ["AWS_SECRET_ACCESSKEY"]
-
-client = boto3.client('s3',
-                      aws_access_key_id=access_key,
-                      aws_secret_access_key=secret_access_key)
-
 # file upload
 upload_path = get_directory_path() + '\\uploads'
 
-bucket_name = os.environ["AWS_STORAGE_BUCKET_NAME"]
+bucket_name = os.getenv("AWS_STORAGE_BUCKET_NAME")
+
+# storage calls share the process wide aws thread pool, see app/helpers/aws.py
+storage_executor = aws_executor
+
+# how many files of one request are uploaded at the same time
+upload_concurrency = int(os.getenv("UPLOAD_CONCURRENCY", "4"))
 
 # def upload_file_to_s3(file_object, app_type):
 #     if app_type == 'professional':
@@ -55,21 +56,9 @@ bucket_name = os.environ["AWS_STORAGE_BUCKET_NAME"]
 
 def upload_image_to_s3(imageFile, new_image_name, folder_path):
     object_name = f'{folder_path}/{new_image_name}'
-    temp = NamedTemporaryFile(delete=False)
     try:
-        try:
-            contents = imageFile.file.read()
-            with temp as f:
-                f.write(contents)
-        except ClientError as e:
-            return {"message": "There was an error uploading the file. " + str(e)}
-        finally:
-            imageFile.file.close()
-
-        client.upload_file(temp.name, bucket_name, object_name, ExtraArgs={
-                           "ACL": 'public-read', "ContentType": imageFile.content_type})
-
-        return new_image_name
+        imageFile.file.seek(0)
+        storage.upload_fileobj(imageFile.file, object_name, imageFile.content_type)
 
         # # upload here
         # client.upload_file(temp.name, bucket_name, object_name, ExtraArgs={"ACL": 'public-read', "ContentType": imageFile.content_type})
@@ -83,12 +72,10 @@ def upload_image_to_s3(imageFile, new_image_name, folder_path):
         #     Key=object_name,
         #     )
         # print('delete', response)
-    except ClientError as e:
-        return {"message": "There was an error processing the file.", "error": e}
     finally:
-        os.remove(temp.name)
-        # print(contents)  # Handle file contents as desired
-        return {"filename": imageFile.filename}
+        imageFile.file.close()
+
+    return {"filename": imageFile.filename}
 
 
 # def upload_file_to_s3(file_object: UploadFile, new_file_name: str, folder_path: str):
@@ -116,34 +103,31 @@ def upload_image_to_s3(imageFile, new_image_name, folder_path):
 def upload_file_to_s3(file_object, new_file_name, folder_path):
     # slash is not needed
     object_name = f'{folder_path}{new_file_name}'
-    temp = NamedTemporaryFile(delete=False)
     try:
-        try:
-            contents = file_object.file.read()
-            with temp as f:
-                f.write(contents)
-
-            print("Successfully read file contents")
-        except ClientError as e:
-            print("Inner Upload file to S3 error: ", e)
-            return {"message": "There was an error uploading the file. " + str(e)}
-        finally:
-            file_object.file.close()
-
-        # upload here
-        client.upload_file(temp.name, bucket_name, object_name, ExtraArgs={
-                           "ACL": 'public-read', "ContentType": file_object.content_type})
+        # stream the spooled upload as is, no full read into memory and no temp file copy.
+        # errors propagate so callers never record a file that isn't there
+        file_object.file.seek(0)
+        storage.upload_fileobj(file_object.file, object_name, file_object.content_type)
 
         print("Successfully uploaded file to s3")
 
         return new_file_name
-    except ClientError as e:
-        print("Outer Upload file to S3 error: ", e)
-        return {"message": "There was an error processing the file.", "error": e}
     finally:
-        os.remove(temp.name)
-        # print(contents)  # Handle file contents as desired
-        return {"filename": file_object.filename}
+        file_object.file.close()
+
+
+def upload_bytes_to_s3(data, file_path, content_type):
+    storage.put_bytes(data, file_path, content_type)
+
+    return file_path
+
+
+def download_file_from_s3(file_path):
+    return storage.get_bytes(file_path)
+
+
+def delete_file_from_s3(file_path):
+    storage.delete(file_path)
 
 
 # generate s3 bucket url
@@ -152,15 +136,7 @@ def generate_s3_url(file_name, access_type):
     try:
         # expiration_time = datetime.datetime.utcnow() + datetime.timedelta(seconds=)
 
-        if access_type == 'read':
-            url = client.generate_presigned_url(
-                'get_object', Params={'Bucket': bucket_name, 'Key': file_name}, ExpiresIn=60)
-
-            # cut off the query string
-            url = url.split('?')[0]
-        elif access_type == 'write':
-            url = client.generate_presigned_url(
-                'put_object', Params={'Bucket': bucket_name, 'Key': file_name}, ExpiresIn=60)
+        url = storage.url(file_name, access_type)
 
         # print("url: ", url)
 
@@ -169,10 +145,60 @@ def generate_s3_url(file_name, access_type):
         print("Credentials not available")
 
 
+def generate_presigned_upload(file_path, content_type, max_size, expires_in=900):
+    return storage.presigned_upload(file_path, content_type, max_size, expires_in)
+
+
 def is_file_exists(file_path):
-    try:
-        response = client.head_object(Bucket=bucket_name, Key=file_path)
-        # print(response)
-        return True
-    except ClientError as e:
-        return False
+    return storage.exists(file_path)
+
+
+# async storage api, use these from async def handlers
+
+async def run_in_storage_executor(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(storage_executor, functools.partial(func, *args, **kwargs))
+
+
+async def is_file_exists_async(file_path):
+    return await run_in_storage_executor(is_file_exists, file_path)
+
+
+async def generate_presigned_upload_async(file_path, content_type, max_size, expires_in=900):
+    return await run_in_storage_executor(generate_presigned_upload, file_path, content_type, max_size, expires_in)
+
+
+async def upload_bytes_to_s3_async(data, file_path, content_type):
+    return await run_in_storage_executor(upload_bytes_to_s3, data, file_path, content_type)
+
+
+async def download_file_from_s3_async(file_path):
+    return await run_in_storage_executor(download_file_from_s3, file_path)
+
+
+async def delete_file_from_s3_async(file_path):
+    return await run_in_storage_executor(delete_file_from_s3, file_path)
+
+
+async def create_multipart_upload_async(file_path, content_type):
+    return await run_in_storage_executor(storage.create_multipart, file_path, content_type)
+
+
+async def presigned_upload_part_async(file_path, upload_id, part_number, expires_in=900):
+    return await run_in_storage_executor(storage.presigned_upload_part, file_path, upload_id, part_number, expires_in)
+
+
+async def list_multipart_parts_async(file_path, upload_id):
+    return await run_in_storage_executor(storage.list_parts, file_path, upload_id)
+
+
+async def read_file_head_async(file_path, size):
+    return await run_in_storage_executor(storage.read_head, file_path, size)
+
+
+async def complete_multipart_upload_async(file_path, upload_id, parts):
+    return await run_in_storage_executor(storage.complete_multipart, file_path, upload_id, parts)
+
+
+async def abort_multipart_upload_async(file_path, upload_id):
+    return await run_in_storage_executor(storage.abort_multipart, file_path, upload_id)
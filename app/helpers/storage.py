@@ -0,0 +1,199 @@
+# object storage behind one interface
+#
+# STORAGE_BACKEND=s3 (default) talks to the bucket through the pooled client
+# from app/helpers/aws.py. STORAGE_BACKEND=local keeps objects as plain files
+# under STORAGE_LOCAL_ROOT with the same keys, so the upload and document
+# paths can be run and benchmarked without aws.
+#
+# both backends are synchronous, async handlers go through the wrappers in
+# app/helpers/s3_file_upload.py which run them on the storage thread pool.
+import os
+import shutil
+from pathlib import Path
+from urllib.parse import quote
+
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+from dotenv import load_dotenv
+
+from app.helpers.aws import get_client
+
+load_dotenv()
+
+# uploads stream from the spooled UploadFile straight to s3, anything bigger
+# than one part goes up as a multipart upload of UPLOAD_PART_SIZE_MB parts
+upload_part_size = int(os.getenv("UPLOAD_PART_SIZE_MB", "8")) * 1024 * 1024
+
+transfer_config = TransferConfig(
+    multipart_threshold=upload_part_size,
+    multipart_chunksize=upload_part_size,
+    max_concurrency=int(os.getenv("UPLOAD_PART_CONCURRENCY", "4")),
+)
+
+
+class PresignUnsupported(Exception):
+    # the backend can't hand out urls the client uploads to directly
+    pass
+
+
+class S3Storage:
+    def __init__(self, bucket_name: str):
+        self.bucket_name = bucket_name
+
+    @property
+    def client(self):
+        return get_client('s3')
+
+    def upload_fileobj(self, fileobj, key, content_type):
+        self.client.upload_fileobj(fileobj, self.bucket_name, key, ExtraArgs={
+            "ACL": 'public-read', "ContentType": content_type}, Config=transfer_config)
+
+    def upload_file(self, path, key, content_type):
+        self.client.upload_file(path, self.bucket_name, key, ExtraArgs={
+            "ACL": 'public-read', "ContentType": content_type}, Config=transfer_config)
+
+    def put_bytes(self, data, key, content_type):
+        self.client.put_object(Bucket=self.bucket_name, Key=key, Body=data,
+                               ACL='public-read', ContentType=content_type)
+
+    def get_bytes(self, key):
+        return self.client.get_object(Bucket=self.bucket_name, Key=key)['Body'].read()
+
+    def read_head(self, key, size):
+        return self.client.get_object(
+            Bucket=self.bucket_name, Key=key, Range=f'bytes=0-{size - 1}')['Body'].read()
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket_name, Key=key)
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket_name, Key=key)
+            return True
+        except ClientError:
+            return False
+
+    def url(self, key, access_type='read'):
+        if access_type == 'read':
+            url = self.client.generate_presigned_url(
+                'get_object', Params={'Bucket': self.bucket_name, 'Key': key}, ExpiresIn=60)
+
+            # objects are public-read, cut off the query string
+            return url.split('?')[0]
+
+        return self.client.generate_presigned_url(
+            'put_object', Params={'Bucket': self.bucket_name, 'Key': key}, ExpiresIn=60)
+
+    def presigned_upload(self, key, content_type, max_size, expires_in=900):
+        # browser uploads straight to the bucket with a presigned POST, the policy pins
+        # the key, content type and a size range so the form can't be reused for anything else
+        return self.client.generate_presigned_post(
+            self.bucket_name, key,
+            Fields={"acl": "public-read", "Content-Type": content_type},
+            Conditions=[
+                {"acl": "public-read"},
+                {"Content-Type": content_type},
+                ["content-length-range", 1, max_size],
+            ],
+            ExpiresIn=expires_in)
+
+    # multipart uploads whose parts the client PUTs straight to the bucket, see the
+    # resumable upload sessions in app/routers/applicant.py. parts are (part_number, etag)
+
+    def create_multipart(self, key, content_type):
+        return self.client.create_multipart_upload(
+            Bucket=self.bucket_name, Key=key, ACL='public-read', ContentType=content_type)['UploadId']
+
+    def presigned_upload_part(self, key, upload_id, part_number, expires_in=900):
+        return self.client.generate_presigned_url(
+            'upload_part',
+            Params={'Bucket': self.bucket_name, 'Key': key, 'UploadId': upload_id, 'PartNumber': part_number},
+            ExpiresIn=expires_in)
+
+    def list_parts(self, key, upload_id):
+        # (part_number, etag, size) of every part stored so far
+        parts = []
+        paginator = self.client.get_paginator('list_parts')
+        for page in paginator.paginate(Bucket=self.bucket_name, Key=key, UploadId=upload_id):
+            parts.extend((part['PartNumber'], part['ETag'], part['Size']) for part in page.get('Parts', []))
+        return parts
+
+    def complete_multipart(self, key, upload_id, parts):
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket_name, Key=key, UploadId=upload_id,
+            MultipartUpload={"Parts": [{"PartNumber": part_number, "ETag": etag}
+                                       for part_number, etag in sorted(parts)]})
+
+    def abort_multipart(self, key, upload_id):
+        self.client.abort_multipart_upload(Bucket=self.bucket_name, Key=key, UploadId=upload_id)
+
+
+class LocalStorage:
+    # files under root, same keys as the bucket. meant for development and benchmarks
+    def __init__(self, root: str, base_url: str = None):
+        self.root = Path(root).resolve()
+        self.base_url = base_url or self.root.as_uri() + '/'
+
+    def path(self, key):
+        path = (self.root / key).resolve()
+        if self.root not in path.parents:
+            raise ValueError(f"Key outside of the storage root: {key}")
+        return path
+
+    def upload_fileobj(self, fileobj, key, content_type):
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # write next to the target and rename, readers never see a partial file
+        temp_path = path.with_name(path.name + '.part')
+        with open(temp_path, 'wb') as f:
+            shutil.copyfileobj(fileobj, f, upload_part_size)
+        os.replace(temp_path, path)
+
+    def upload_file(self, path, key, content_type):
+        with open(path, 'rb') as f:
+            self.upload_fileobj(f, key, content_type)
+
+    def put_bytes(self, data, key, content_type):
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+    def get_bytes(self, key):
+        return self.path(key).read_bytes()
+
+    def read_head(self, key, size):
+        with open(self.path(key), 'rb') as f:
+            return f.read(size)
+
+    def delete(self, key):
+        self.path(key).unlink(missing_ok=True)
+
+    def exists(self, key):
+        return self.path(key).is_file()
+
+    def url(self, key, access_type='read'):
+        return self.base_url + quote(key)
+
+    def presigned_upload(self, key, content_type, max_size, expires_in=900):
+        raise PresignUnsupported("Direct uploads need STORAGE_BACKEND=s3, send the files to the api instead.")
+
+    # resumable upload sessions send their parts straight to the bucket, there is
+    # nothing to hand out here, so sessions are refused when they are opened
+
+    def create_multipart(self, key, content_type):
+        raise PresignUnsupported("Direct uploads need STORAGE_BACKEND=s3, send the files to the api instead.")
+
+
+def create_storage():
+    backend = os.getenv("STORAGE_BACKEND", "s3").lower()
+
+    if backend == "local":
+        return LocalStorage(os.getenv("STORAGE_LOCAL_ROOT", "storage"), os.getenv("STORAGE_LOCAL_URL"))
+    if backend == "s3":
+        return S3Storage(os.getenv("AWS_STORAGE_BUCKET_NAME"))
+
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+
+storage = create_storage()
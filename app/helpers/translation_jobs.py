@@ -0,0 +1,181 @@
+# background applicant translations
+#
+# jobs live in the translation_jobs table. an in-process pool of asyncio workers
+# claims them with SELECT ... FOR UPDATE SKIP LOCKED, so several processes can
+# share the queue without running a job twice. a failed job is retried with
+# exponential backoff until TRANSLATION_JOB_MAX_ATTEMPTS, a job whose worker
+# died while running is picked up again once it is TRANSLATION_JOB_STALE_MINUTES old.
+#
+# on lambda the api process only lives for one request, mangum runs startup and
+# shutdown around every invocation, so no in-process workers are started there
+# (TRANSLATION_WORKERS defaults to 0). the queue is drained by the handler in
+# app/jobs.py instead, run on a schedule and invoked asynchronously on every
+# enqueue when TRANSLATION_JOB_FUNCTION names its function.
+import asyncio
+import logging
+import os
+import time
+from datetime import timedelta
+
+import orjson
+from dotenv import load_dotenv
+from tortoise import timezone
+from tortoise.exceptions import DoesNotExist
+from tortoise.expressions import Q
+from tortoise.transactions import in_transaction
+
+from app.helpers.applicant_translation import translate_applicant
+from app.helpers.aws import get_client, run_in_aws_executor
+from app.helpers.cache import dump_json
+from app.models.translation_job import TranslationJob
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+on_lambda = bool(os.getenv("AWS_LAMBDA_FUNCTION_NAME"))
+
+worker_count = int(os.getenv("TRANSLATION_WORKERS", "0" if on_lambda else "2"))
+max_attempts = int(os.getenv("TRANSLATION_JOB_MAX_ATTEMPTS", "3"))
+retry_backoff_seconds = int(os.getenv("TRANSLATION_JOB_RETRY_SECONDS", "5"))
+poll_interval = float(os.getenv("TRANSLATION_JOB_POLL_SECONDS", "5"))
+stale_after = timedelta(minutes=int(os.getenv("TRANSLATION_JOB_STALE_MINUTES", "10")))
+# lambda function running app.jobs.handler, invoked without waiting on every enqueue
+job_function = os.getenv("TRANSLATION_JOB_FUNCTION")
+
+# set on enqueue so an idle worker doesn't wait for the next poll
+_wakeup = asyncio.Event()
+_workers = []
+
+
+async def enqueue_translation_job(applicant_id, unique_questions, force=False) -> TranslationJob:
+    job = await TranslationJob.create(
+        applicant_id=applicant_id, unique_questions=unique_questions, force=force, run_after=timezone.now())
+    _wakeup.set()
+
+    if job_function:
+        try:
+            await run_in_aws_executor(
+                get_client('lambda').invoke, FunctionName=job_function, InvocationType='Event', Payload=b'{}')
+        except Exception as e:
+            # the scheduled run of the consumer still picks the job up
+            logger.error(f"Invoking {job_function} for translation job {job.id} failed: {e}")
+
+    return job
+
+
+async def claim_job():
+    now = timezone.now()
+    async with in_transaction():
+        job = await TranslationJob.filter(
+            Q(status='queued', run_after__lte=now) | Q(status='running', locked_at__lt=now - stale_after)
+        ).order_by('created_at').select_for_update(skip_locked=True).first()
+
+        if job is None:
+            return None
+
+        job.status = 'running'
+        job.attempts += 1
+        job.locked_at = now
+        await job.save(update_fields=['status', 'attempts', 'locked_at'])
+
+    return job
+
+
+async def run_job(job: TranslationJob):
+    # a stale job that already used up its attempts isn't started again
+    if job.attempts > max_attempts:
+        await TranslationJob.filter(id=job.id).update(
+            status='failed', error=job.error or "Worker stopped while running the job.", locked_at=None)
+        return
+
+    async def progress(completed, total):
+        await TranslationJob.filter(id=job.id).update(completed=completed, total=total)
+
+    try:
+        result = await translate_applicant(job.applicant_id, job.unique_questions, progress, job.force)
+    except asyncio.CancelledError:
+        # the worker is being stopped, hand the job back without spending an attempt
+        await asyncio.shield(TranslationJob.filter(id=job.id).update(
+            status='queued', attempts=job.attempts - 1, locked_at=None))
+        raise
+    except Exception as e:
+        retry = job.attempts < max_attempts and not isinstance(e, DoesNotExist)
+        logger.error(f"Translation job {job.id} attempt {job.attempts} failed: {e}")
+
+        await TranslationJob.filter(id=job.id).update(
+            status='queued' if retry else 'failed',
+            error=str(e),
+            run_after=timezone.now() + timedelta(seconds=retry_backoff_seconds * 2 ** (job.attempts - 1)),
+            locked_at=None)
+        return
+
+    # the payload has uuids and dates, store it the way the api would render it
+    await TranslationJob.filter(id=job.id).update(
+        status='done', error=None, result=orjson.loads(dump_json(result)), locked_at=None)
+
+
+async def worker():
+    while True:
+        try:
+            job = await claim_job()
+        except Exception as e:
+            logger.error(f"Claiming a translation job failed: {e}")
+            job = None
+
+        if job is None:
+            try:
+                await asyncio.wait_for(_wakeup.wait(), poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            _wakeup.clear()
+            continue
+
+        await run_job(job)
+
+
+async def drain_translation_jobs(max_jobs=None, deadline=None) -> int:
+    """
+    Run the jobs that are due one after another until none is left, max_jobs ran
+    or time.monotonic() passes deadline. Returns how many jobs were run.
+    """
+    processed = 0
+
+    while max_jobs is None or processed < max_jobs:
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+
+        job = await claim_job()
+        if job is None:
+            break
+
+        await run_job(job)
+        processed += 1
+
+    return processed
+
+
+def start_translation_workers():
+    for _ in range(worker_count):
+        _workers.append(asyncio.create_task(worker()))
+
+
+async def stop_translation_workers():
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+
+def translation_job_status(job: TranslationJob) -> dict:
+    return {
+        "id": job.id,
+        "applicant_id": job.applicant_id,
+        "status": job.status,
+        "attempts": job.attempts,
+        "progress": {"completed": job.completed, "total": job.total},
+        "error": job.error,
+        "result": job.result,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    }
@@ -0,0 +1,107 @@
+# translation memory
+#
+# every string deepl translates is kept in the translation_memory table under
+# sha256(source), source and target language. an in-process LRU sits in front
+# so repeated strings in a warm lambda don't even reach the database. only the
+# strings neither of them know are sent to deepl.
+import hashlib
+import os
+
+from dotenv import load_dotenv
+
+from app.helpers.cache import LRUCache
+from app.models.translation_memory import TranslationMemory
+
+load_dotenv()
+
+memory_max_entries = int(os.getenv("TRANSLATION_MEMORY_MAX_ENTRIES", "4096"))
+memory_ttl = int(os.getenv("TRANSLATION_MEMORY_TTL_SECONDS", "86400"))
+
+
+def source_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def normalize_lang(lang) -> str:
+    # deepl detects the source language when none is given
+    return lang.upper() if lang else 'auto'
+
+
+class TranslationMemoryCache:
+    def __init__(self, maxsize: int = 4096, ttl: int = 86400):
+        self.local = LRUCache(maxsize, ttl)
+        self.hits = 0
+        self.misses = 0
+        self.saved_characters = 0
+        self.translated_characters = 0
+
+    async def get_many(self, texts, source_lang, target_lang) -> list:
+        """
+        Known translations for texts, None where the memory has nothing yet.
+        """
+        source_lang, target_lang = normalize_lang(source_lang), normalize_lang(target_lang)
+        hashes = [source_hash(text) for text in texts]
+        found = {}
+
+        for digest in set(hashes):
+            hit, translation = self.local.get((digest, source_lang, target_lang))
+            if hit:
+                found[digest] = translation
+
+        missing = list(set(hashes) - found.keys())
+        if missing:
+            rows = await TranslationMemory.filter(
+                source_hash__in=missing, source_lang=source_lang, target_lang=target_lang
+            ).values_list('source_hash', 'translation')
+            for digest, translation in rows:
+                found[digest] = translation
+                self.local.set((digest, source_lang, target_lang), translation)
+
+        translations = [found.get(digest) for digest in hashes]
+
+        for text, translation in zip(texts, translations):
+            if translation is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.saved_characters += len(text)
+
+        return translations
+
+    async def set_many(self, texts, translations, source_lang, target_lang, overwrite=False):
+        source_lang, target_lang = normalize_lang(source_lang), normalize_lang(target_lang)
+        entries = {}
+
+        for text, translation in zip(texts, translations):
+            digest = source_hash(text)
+            self.local.set((digest, source_lang, target_lang), translation)
+            self.translated_characters += len(text)
+            entries[digest] = TranslationMemory(
+                source_hash=digest, source_lang=source_lang, target_lang=target_lang,
+                translation=translation, characters=len(text))
+
+        if not entries:
+            return
+
+        if overwrite:
+            # a forced re-translation replaces what the memory had
+            await TranslationMemory.bulk_create(
+                list(entries.values()), on_conflict=['source_hash', 'source_lang', 'target_lang'],
+                update_fields=['translation', 'characters'])
+        else:
+            # another request may have stored the same string in the meantime
+            await TranslationMemory.bulk_create(list(entries.values()), ignore_conflicts=True)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "saved_characters": self.saved_characters,
+            "translated_characters": self.translated_characters,
+            "local_entries": len(self.local),
+        }
+
+
+translation_memory = TranslationMemoryCache(memory_max_entries, memory_ttl)
@@ -1,14 +1,122 @@
 # DEEPL translator class
 import os
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+import deepl
 from deepl import Translator as DeeplTranslator
 from dotenv import load_dotenv
 
+from app.helpers.translation_memory import translation_memory
+
 load_dotenv()
 
+# deepl takes at most 50 texts and 128 KiB per request, stay a little below
+batch_max_texts = int(os.getenv("DEEPL_BATCH_MAX_TEXTS", "50"))
+batch_max_bytes = int(os.getenv("DEEPL_BATCH_MAX_KB", "120")) * 1024
+
+# whole deepl call, batches included. deepl's own client retries inside this
+translate_timeout = float(os.getenv("DEEPL_TIMEOUT_SECONDS", "30"))
+
+# limits of the deepl client itself, so a thread left behind by a timeout
+# doesn't keep retrying long after the caller gave up
+deepl.http_client.min_connection_timeout = float(os.getenv("DEEPL_CONNECTION_TIMEOUT_SECONDS", "10"))
+deepl.http_client.max_network_retries = int(os.getenv("DEEPL_MAX_RETRIES", "2"))
+
+translator_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("DEEPL_MAX_WORKERS", "4")), thread_name_prefix="deepl")
+
+
+def translation_batches(texts: List[str]):
+    # consecutive slices of texts within the count and size limits, a single
+    # oversized text still gets a batch of its own
+    batch = []
+    batch_bytes = 0
+    for text in texts:
+        size = len(text.encode('utf-8'))
+        if batch and (len(batch) >= batch_max_texts or batch_bytes + size > batch_max_bytes):
+            yield batch
+            batch = []
+            batch_bytes = 0
+        batch.append(text)
+        batch_bytes += size
+
+    if batch:
+        yield batch
+
+
+class TranslationTimeout(Exception):
+    pass
+
 
 class Translator:
-    def __init__(self):
-        self.deepl = DeeplTranslator(os.getenv("DEEPL_API_KEY"))
+    # use the process wide `translator` below, one deepl client keeps its http
+    # session and connections for every request of a warm process
+    def __init__(self, memory=translation_memory, timeout: float = translate_timeout):
+        self.memory = memory
+        self.timeout = timeout
+        self._deepl = None
+        self._lock = threading.Lock()
+
+    @property
+    def deepl(self):
+        # created on first use, the api key isn't needed to import the app
+        if self._deepl is None:
+            with self._lock:
+                if self._deepl is None:
+                    self._deepl = DeeplTranslator(os.getenv("DEEPL_API_KEY"))
+        return self._deepl
+
+    def translate_uncached(self, texts: List[str], target_lang: str = "JA", source_lang: str = None) -> List[str]:
+        # straight to deepl, with as few requests as the deepl limits allow. blocks,
+        # async code goes through translate / translate_many
+        translated = []
+        for batch in translation_batches(texts):
+            results = self.deepl.translate_text(batch, source_lang=source_lang, target_lang=target_lang)
+            translated.extend(result.text for result in results)
+        return translated
+
+    async def translate_uncached_async(self, texts: List[str], target_lang: str = "JA", source_lang: str = None) -> List[str]:
+        # the deepl client is synchronous, run it on the translator threads so the
+        # event loop keeps serving other requests during the round-trip
+        loop = asyncio.get_running_loop()
+        call = loop.run_in_executor(
+            translator_executor, functools.partial(self.translate_uncached, texts, target_lang, source_lang))
+        try:
+            return await asyncio.wait_for(call, self.timeout)
+        except asyncio.TimeoutError:
+            raise TranslationTimeout(f"DeepL did not answer within {self.timeout} seconds")
+
+    async def translate(self, text: str, target_lang: str = "JA", source_lang: str = None) -> str:
+        return (await self.translate_many([text], target_lang, source_lang))[0]
+
+    async def translate_many(self, texts: List[str], target_lang: str = "JA", source_lang: str = None,
+                             use_memory: bool = True) -> List[str]:
+        """
+        Translate a list of texts, returns the translated strings in the same order.
+        Strings found in the translation memory are not sent to deepl. With
+        use_memory=False every string is translated again and replaces its entry.
+        """
+        if use_memory:
+            translations = await self.memory.get_many(texts, source_lang, target_lang)
+        else:
+            translations = [None] * len(texts)
+
+        # every distinct unknown string goes to deepl once
+        missing = list(dict.fromkeys(
+            text for text, translation in zip(texts, translations) if translation is None))
+
+        if missing:
+            translated = dict(zip(missing, await self.translate_uncached_async(missing, target_lang, source_lang)))
+            await self.memory.set_many(list(translated), list(translated.values()), source_lang, target_lang,
+                                       overwrite=not use_memory)
+
+            translations = [translated[text] if translation is None else translation
+                            for text, translation in zip(texts, translations)]
+
+        return translations
+
 
-    def translate(self, text: str, target_lang: str = "JA"):
-        return self.deepl.translate_text(text, target_lang=target_lang)
+translator = Translator()
@@ -0,0 +1,224 @@
+# upload validation that doesn't trust the client
+#
+# the content type of a multipart file is whatever the browser or client said.
+# validate_upload reads the first bytes of the spooled file to find the real
+# type and checks its size against the cap for that type, before the file is
+# processed or uploaded anywhere.
+#
+# BodySizeLimitMiddleware rejects requests that are larger than any upload we
+# accept, from Content-Length before the body is read and by counting while
+# it streams in when there is no Content-Length. for multipart bodies it also
+# follows each file part as it streams in and stops it as soon as it is larger
+# than the cap for the type its first bytes show, before the rest is spooled.
+import os
+
+import multipart
+from multipart.multipart import parse_options_header
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+# form parsing hands out starlette's UploadFile, fastapi's is a subclass of it
+from starlette.datastructures import UploadFile
+
+sniff_size = 64
+
+image_types = ('image/jpeg', 'image/png')
+video_types = ('video/mp4', 'video/quicktime', 'video/x-msvideo')
+document_types = ('application/pdf',)
+
+max_upload_sizes = {
+    'image/jpeg': 10 * 1024 * 1024,
+    'image/png': 10 * 1024 * 1024,
+    'application/pdf': 10 * 1024 * 1024,
+    'video/mp4': 500 * 1024 * 1024,
+    'video/quicktime': 500 * 1024 * 1024,
+    'video/x-msvideo': 500 * 1024 * 1024,
+}
+
+max_request_body_size = int(os.getenv("MAX_REQUEST_BODY_MB", "600")) * 1024 * 1024
+
+# ftyp major brands of heic/heif images
+heif_brands = (b'heic', b'heix', b'hevc', b'hevx', b'heim', b'heis', b'mif1', b'msf1')
+
+# labels that name the same thing, mp4 and mov share the iso container and
+# phones label either one as the other
+content_type_aliases = {
+    'image/jpg': 'image/jpeg',
+    'image/pjpeg': 'image/jpeg',
+    'video/quicktime': 'video/mp4',
+}
+
+
+def sniff_content_type(head: bytes):
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if head.startswith(b'%PDF-'):
+        return 'application/pdf'
+    if head[4:8] == b'ftyp':
+        # heic/heif photos share the iso container with mp4, the brand tells them apart
+        if head[8:12] in heif_brands:
+            return 'image/heic' if head[8:12] in (b'heic', b'heix', b'hevc', b'hevx') else 'image/heif'
+        return 'video/quicktime' if head[8:12] == b'qt  ' else 'video/mp4'
+    if head[:4] == b'RIFF' and head[8:12] == b'AVI ':
+        return 'video/x-msvideo'
+    return None
+
+
+def same_content_type(claimed, sniffed) -> bool:
+    claimed = (claimed or '').split(';')[0].strip().lower()
+    return content_type_aliases.get(claimed, claimed) == content_type_aliases.get(sniffed, sniffed)
+
+
+def check_content(head: bytes, claimed, allowed_types, name: str) -> str:
+    sniffed = sniff_content_type(head)
+
+    if sniffed is None or sniffed not in allowed_types:
+        raise HTTPException(status_code=400, detail=f"Invalid file type for {name}.")
+
+    if claimed and not same_content_type(claimed, sniffed):
+        raise HTTPException(
+            status_code=400, detail=f"{name} is labeled {claimed} but contains {sniffed}.")
+
+    return sniffed
+
+
+def upload_size(file: UploadFile) -> int:
+    if file.size is not None:
+        return file.size
+
+    position = file.file.tell()
+    file.file.seek(0, os.SEEK_END)
+    size = file.file.tell()
+    file.file.seek(position)
+    return size
+
+
+def validate_upload(file: UploadFile, allowed_types) -> str:
+    """
+    Sniff the real type of an uploaded file and enforce the size cap for that type.
+    Returns the sniffed content type, raises HTTPException 400/413 otherwise.
+    """
+    file.file.seek(0)
+    head = file.file.read(sniff_size)
+    file.file.seek(0)
+
+    name = file.filename or 'file'
+    sniffed = check_content(head, file.content_type, allowed_types, name)
+
+    max_size = max_upload_sizes[sniffed]
+    if upload_size(file) > max_size:
+        raise HTTPException(
+            status_code=413, detail=f"{name} is larger than {max_size // (1024 * 1024)} MB.")
+
+    return sniffed
+
+
+def validate_uploads(files, allowed_types):
+    for file in files:
+        if isinstance(file, UploadFile):
+            validate_upload(file, allowed_types)
+
+
+class UploadPartLimiter:
+    # follows a multipart/form-data body chunk by chunk. a file part is measured
+    # while it arrives and refused once it passes the cap for its sniffed type,
+    # types we don't accept get the smallest cap, they are refused later anyway
+    def __init__(self, boundary: bytes):
+        self.parser = multipart.MultipartParser(boundary, {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_part_data": self.on_part_data,
+        })
+        self.on_part_begin()
+
+    def on_part_begin(self):
+        self.header_field = b''
+        self.header_value = b''
+        self.filename = None
+        self.head = b''
+        self.size = 0
+        self.max_size = None
+
+    def on_header_field(self, data, start, end):
+        self.header_field += data[start:end]
+
+    def on_header_value(self, data, start, end):
+        self.header_value += data[start:end]
+
+    def on_header_end(self):
+        if self.header_field.lower() == b'content-disposition':
+            _, options = parse_options_header(self.header_value)
+            if b'filename' in options:
+                self.filename = options[b'filename'].decode('utf-8', 'replace') or 'file'
+        self.header_field = b''
+        self.header_value = b''
+
+    def on_part_data(self, data, start, end):
+        if self.filename is None:
+            return
+
+        self.size += end - start
+
+        if self.max_size is None:
+            self.head += data[start:min(end, start + sniff_size - len(self.head))]
+            if len(self.head) < sniff_size:
+                return
+            self.max_size = max_upload_sizes.get(sniff_content_type(self.head), min(max_upload_sizes.values()))
+
+        if self.size > self.max_size:
+            raise HTTPException(
+                status_code=413, detail=f"{self.filename} is larger than {self.max_size // (1024 * 1024)} MB.")
+
+    def write(self, data: bytes):
+        self.parser.write(data)
+
+
+def upload_part_limiter(headers: dict):
+    content_type, options = parse_options_header(headers.get(b'content-type', b''))
+    if content_type != b'multipart/form-data' or not options.get(b'boundary'):
+        return None
+    return UploadPartLimiter(options[b'boundary'])
+
+
+class BodySizeLimitMiddleware:
+    def __init__(self, app, max_body_size: int = max_request_body_size):
+        self.app = app
+        self.max_body_size = max_body_size
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope['headers'])
+        content_length = headers.get(b'content-length')
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_body_size:
+            response = JSONResponse(status_code=413, content={"detail": "Request body is too large."})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+        limiter = upload_part_limiter(headers)
+
+        async def limited_receive():
+            nonlocal received, limiter
+            message = await receive()
+            if message['type'] == 'http.request':
+                body = message.get('body', b'')
+                received += len(body)
+                if received > self.max_body_size:
+                    raise HTTPException(status_code=413, detail="Request body is too large.")
+                if limiter is not None and body:
+                    try:
+                        limiter.write(body)
+                    except HTTPException:
+                        raise
+                    except Exception:
+                        # malformed multipart, the form parser reports it
+                        limiter = None
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,44 @@
+# translation job consumer that outlives the api request
+#
+# deploy as its own lambda function with handler app.jobs.handler, give it a
+# schedule (e.g. rate(1 minute)) so retries and stale jobs are picked up, and
+# set TRANSLATION_JOB_FUNCTION on the api function to its name so every enqueue
+# invokes it right away. outside lambda it drains the queue once:
+#
+# usage: python -m app.jobs
+import asyncio
+import os
+import time
+
+from dotenv import load_dotenv
+from tortoise import Tortoise
+
+from app.db.init import db_uri, models
+from app.helpers.translation_jobs import drain_translation_jobs
+
+load_dotenv()
+
+# stop claiming jobs this long before the lambda timeout, one job has to fit in it
+stop_margin_seconds = int(os.getenv("TRANSLATION_JOB_MARGIN_SECONDS", "120"))
+
+
+async def drain(deadline=None) -> int:
+    await Tortoise.init(db_url=db_uri, modules={'models': models})
+    try:
+        return await drain_translation_jobs(deadline=deadline)
+    finally:
+        await Tortoise.close_connections()
+
+
+def handler(event, context):
+    deadline = None
+    if context is not None:
+        deadline = time.monotonic() + context.get_remaining_time_in_millis() / 1000 - stop_margin_seconds
+
+    processed = asyncio.run(drain(deadline))
+    print(f"ran {processed} translation jobs")
+    return {"processed": processed}
+
+
+if __name__ == '__main__':
+    handler(None, None)
@@ -3,7 +3,6 @@ from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from typing import Optional, Union
-from deepl import Translator as DeeplTranslator
 from dotenv import load_dotenv
 import os
 
@@ -20,6 +19,12 @@ from app.routers.company import router as companyRouter
 # mailing
 from app.helpers.mailer import Mailer, EmailSchema
 
+from app.helpers.cache import response_cache
+from app.helpers.translator import translator, TranslationTimeout
+from app.helpers.translation_memory import translation_memory
+from app.helpers.translation_jobs import start_translation_workers, stop_translation_workers
+from app.helpers.upload_validation import BodySizeLimitMiddleware
+
 
 app = FastAPI(title="FJL API", version="1.0",
               description="Philippine Jinzai Kaihatsu Lab API")
@@ -31,8 +36,6 @@ app.mount("/static", StaticFiles(directory="app/static"), name="static")
 initialize_db(app)
 load_dotenv()
 
-deepl_api = os.getenv("DEEPL_API_KEY")
-
 origins = [
     '*',
     # 'http://localhost',
@@ -50,6 +53,21 @@ app.add_middleware(
 
 )
 
+# oversized uploads are turned away before their body is read
+app.add_middleware(BodySizeLimitMiddleware)
+
+# background translation workers, registered after initialize_db so the
+# database is up before they poll the queue
+@app.on_event("startup")
+async def start_workers():
+    start_translation_workers()
+
+
+@app.on_event("shutdown")
+async def stop_workers():
+    await stop_translation_workers()
+
+
 # routers
 app.include_router(userRouter)
 app.include_router(applicantRouter)
@@ -62,6 +80,16 @@ async def read_root():
     return {"Hello": "World"}
 
 
+@app.get("/cache_stats")
+async def cache_stats():
+    return response_cache.stats()
+
+
+@app.get("/translation_stats")
+async def translation_stats():
+    return translation_memory.stats()
+
+
 @app.get("/send_mail_by_guest")
 async def send_mail_by_guest(email: str, name: str, message: str):
     try:
@@ -125,13 +153,12 @@ async def send_mail(recipient_email: str, subject: str, body: str):
 
 @app.get("/deepl_translate")
 async def translate(text: str, target_lang: str = "JA"):
-    # deepl setup
-    translator = DeeplTranslator(deepl_api)
-
     try:
-        translation = translator.translate_text(text, target_lang=target_lang)
-        print(translation.text)
-        return {"translation": translation.text}
+        # answered from the translation memory when this text was translated before
+        translation = await translator.translate(text, target_lang=target_lang)
+        return {"translation": translation}
+    except TranslationTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -15,6 +15,8 @@ class Agency(Model):
     rep_phone = fields.CharField(max_length=20, null=True)
     rep_email = fields.CharField(max_length=255, null=True)
     created_at = fields.DatetimeField(auto_now_add=True)
+    # bumped by a db trigger on every write, see migration 0005
+    version = fields.BigIntField(default=0)
     
 
 agency_pydantic = pydantic_model_creator(
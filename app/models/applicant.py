@@ -1,6 +1,7 @@
 from tortoise.models import Model
 from tortoise import fields
 from tortoise.contrib.pydantic import pydantic_model_creator
+from datetime import date, datetime
 
 
 class Applicant(Model):
@@ -25,10 +26,10 @@ class Applicant(Model):
     passport_expiry = fields.DateField(null=True)
     email = fields.CharField(max_length=255, null=True)
     password_hash = fields.CharField(max_length=128, null=True)
-    family = fields.TextField(null=True)
-    education = fields.TextField(null=True)
-    work_experience = fields.TextField(null=True)
-    qualifications_licenses = fields.TextField(null=True)
+    family = fields.JSONField(null=True)
+    education = fields.JSONField(null=True)
+    work_experience = fields.JSONField(null=True)
+    qualifications_licenses = fields.JSONField(null=True)
     jlpt = fields.CharField(max_length=20, null=True)
     jft = fields.CharField(max_length=20, null=True)
     nat = fields.CharField(max_length=20, null=True)
@@ -40,10 +41,12 @@ class Applicant(Model):
     reason_for_application = fields.TextField(null=True)
     past_experience = fields.TextField(null=True)
     future_career_plan = fields.TextField(null=True)
-    photos = fields.TextField(null=True)
+    photos = fields.JSONField(null=True)
+    # {original key: {"thumb": key, "medium": key}} for photos with webp renditions
+    media_variants = fields.JSONField(null=True)
     links = fields.TextField(null=True)
-    unique_questions = fields.TextField(null=True)
-    required_questions = fields.TextField(null=True)
+    unique_questions = fields.JSONField(null=True)
+    required_questions = fields.JSONField(null=True)
     recruiter = fields.CharField(max_length=255, null=True)
     organization = fields.CharField(max_length=255, null=True)
     visa = fields.CharField(max_length=255, null=True)
@@ -60,7 +63,14 @@ class Applicant(Model):
     ja_future_career_plan = fields.TextField(null=True)
     ja_unique_questions = fields.JSONField(null=True)
     is_translated = fields.BooleanField(default=False)
+    # sha256 of the source text each ja_* value was translated from, see
+    # app/helpers/applicant_translation.py
+    translation_hashes = fields.JSONField(null=True)
     created_at = fields.DatetimeField(auto_now_add=True)
+    # bumped by a db trigger on every write, see migration 0005
+    version = fields.BigIntField(default=0)
+    # search_en / search_ja are generated columns added by migration 0004, they
+    # are maintained by postgres and deliberately not declared here
 
 
 applicant_pydantic = pydantic_model_creator(
@@ -68,6 +78,7 @@ applicant_pydantic = pydantic_model_creator(
     exclude=(
         "password_hash",
         "links",
+        "translation_hashes",
         # "unique_questions", "required_questions", "photos",
         # "future_career_plan", "past_experience", "reason_for_application", "self_introduction",
         # "english", "japanese", "nat", "jft", "jlpt", "qualifications_licenses", "work_experience", "family", "education",
@@ -78,3 +89,25 @@ applicant_pydantic = pydantic_model_creator(
 # admin_applicant_list_pydantic = pydantic_model_creator(
 #     Applicant, name="Applicant", include=("id", "first_name", "last_name", "email", "phone_number", "img_url", "age", "gender", "birth_place", "marital_status", "recruiter", "organization", "visa", "interview_date",  "created_at")
 # )
+
+
+# named column sets for the list endpoints (?fields=grid), everything the admin grid shows
+applicant_fieldsets = {
+    "grid": (
+        "id", "img_url", "first_name", "last_name", "middle_name", "age", "gender",
+        "nationality", "jlpt", "jft", "visa", "recruiter", "organization",
+        "interview_date", "result", "is_translated", "created_at",
+    ),
+}
+
+# sort keys the list endpoints accept, with how a cursor value is parsed back
+applicant_sort_keys = {
+    "created_at": datetime.fromisoformat,
+    "interview_date": date.fromisoformat,
+    "first_name": str,
+    "last_name": str,
+    "age": int,
+}
+
+# every column the full list returns, the same set applicant_pydantic exposes
+applicant_columns = tuple(applicant_pydantic.model_fields)
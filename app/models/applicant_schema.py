@@ -1,5 +1,6 @@
 from datetime import date
-from typing import Union, Dict, Any, List, Optional
+from typing import Union, Dict, Any, List, Optional, Literal
+from uuid import UUID
 from pydantic import BaseModel, root_validator, validator, EmailStr, SecretStr
 from fastapi import UploadFile, File
 import json
@@ -124,3 +125,34 @@ class CreateApplicantToken(BaseModel):
                 raise ValueError('Form has an empty field.')
 
         return values
+
+
+class PresignUploadFile(BaseModel):
+    kind: Literal['display_photo', 'photo', 'video', 'license']
+    filename: str
+    content_type: str
+    size: int
+
+
+class PresignUploadRequest(BaseModel):
+    applicant_id: UUID
+    files: List[PresignUploadFile]
+
+
+class FinalizeUploadFile(BaseModel):
+    kind: Literal['display_photo', 'photo', 'video', 'license']
+    key: str
+    # position in qualifications_licenses, only for kind == 'license'
+    license_index: Optional[int] = None
+
+
+class FinalizeUploadRequest(BaseModel):
+    applicant_id: UUID
+    files: List[FinalizeUploadFile]
+
+
+class CreateUploadSessionRequest(BaseModel):
+    applicant_id: UUID
+    filename: str
+    content_type: str
+    size: int
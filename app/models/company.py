@@ -40,6 +40,8 @@ class Company(Model):
     parttime_worker_count = fields.IntField(null=True)
     foreigner_worker_count = fields.IntField(null=True)
     created_at = fields.DatetimeField(auto_now_add=True)
+    # bumped by a db trigger on every write, see migration 0005
+    version = fields.BigIntField(default=0)
 
     class Meta:
         table = "companies"
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, HttpUrl, UUID4
-from typing import List, Optional
+from typing import List, Optional, Literal
 from datetime import date, datetime
 
 
@@ -30,3 +30,14 @@ class Interviewee(BaseModel):
     is_verified: bool
     created_at: datetime
     updated_at: datetime
+
+
+class PresignUploadFile(BaseModel):
+    kind: Literal['interviewee_image', 'residence_card_image']
+    filename: str
+    content_type: str
+    size: int
+
+
+class PresignUploadRequest(BaseModel):
+    files: List[PresignUploadFile]
@@ -0,0 +1,14 @@
+from tortoise.models import Model
+from tortoise import fields
+
+
+class StoredObject(Model):
+    # index of content addressed objects already in the bucket, see app/helpers/content_store.py
+    key = fields.CharField(max_length=512, pk=True)
+    sha256 = fields.CharField(max_length=64, index=True)
+    size = fields.BigIntField()
+    content_type = fields.CharField(max_length=255, null=True)
+    created_at = fields.DatetimeField(auto_now_add=True)
+
+    class Meta:
+        table = "stored_objects"
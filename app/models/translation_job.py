@@ -0,0 +1,27 @@
+from tortoise.models import Model
+from tortoise import fields
+
+
+class TranslationJob(Model):
+    # queued applicant translation, run by the workers in app/helpers/translation_jobs.py
+    id = fields.UUIDField(pk=True, index=True)
+    applicant_id = fields.UUIDField(index=True)
+    unique_questions = fields.JSONField(null=True)
+    # re-translate fields whose source did not change
+    force = fields.BooleanField(default=False)
+    # queued, running, done or failed
+    status = fields.CharField(max_length=20, default='queued', index=True)
+    attempts = fields.IntField(default=0)
+    # source strings translated so far out of total
+    completed = fields.IntField(default=0)
+    total = fields.IntField(default=0)
+    error = fields.TextField(null=True)
+    # bilingual applicant payload once done
+    result = fields.JSONField(null=True)
+    run_after = fields.DatetimeField()
+    locked_at = fields.DatetimeField(null=True)
+    created_at = fields.DatetimeField(auto_now_add=True)
+    updated_at = fields.DatetimeField(auto_now=True)
+
+    class Meta:
+        table = "translation_jobs"
@@ -0,0 +1,18 @@
+from tortoise.models import Model
+from tortoise import fields
+
+
+class TranslationMemory(Model):
+    # one translated string, see app/helpers/translation_memory.py
+    id = fields.IntField(pk=True)
+    source_hash = fields.CharField(max_length=64)
+    # deepl source language code, 'auto' when deepl detected it
+    source_lang = fields.CharField(max_length=16)
+    target_lang = fields.CharField(max_length=16)
+    translation = fields.TextField()
+    characters = fields.IntField()
+    created_at = fields.DatetimeField(auto_now_add=True)
+
+    class Meta:
+        table = "translation_memory"
+        unique_together = (("source_hash", "source_lang", "target_lang"),)
@@ -0,0 +1,24 @@
+from tortoise.models import Model
+from tortoise import fields
+
+
+class UploadSession(Model):
+    # one resumable video upload, backed by a multipart upload in storage
+    id = fields.UUIDField(pk=True, index=True)
+    applicant_id = fields.UUIDField(index=True)
+    key = fields.CharField(max_length=512)
+    content_type = fields.CharField(max_length=255)
+    size = fields.BigIntField()
+    chunk_size = fields.IntField()
+    upload_id = fields.CharField(max_length=1024)
+    # bytes of the parts storage holds, as of the last status or complete call
+    received = fields.BigIntField(default=0)
+    # [part_number, etag] pairs for the stored parts, read back with ListParts
+    parts = fields.JSONField(default=list)
+    # open, complete or aborted
+    status = fields.CharField(max_length=20, default='open')
+    created_at = fields.DatetimeField(auto_now_add=True)
+    updated_at = fields.DatetimeField(auto_now=True)
+
+    class Meta:
+        table = "upload_sessions"
@@ -8,35 +8,52 @@ import pandas as pd
 import requests
 import pytz
 import logging
+import asyncio
 
 from typing import List, Type, Optional, Union
-from datetime import datetime, timedelta, timezone, time
+from datetime import date, datetime, timedelta, timezone, time
 from io import BytesIO
+from uuid import UUID, uuid4
 
 # env
 from dotenv import load_dotenv
 
 
 # fast api
-from fastapi import APIRouter, status, HTTPException, File, Form, UploadFile, Response
-from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
+from fastapi import APIRouter, status, HTTPException, File, Form, UploadFile, Response, Query, Depends, Request
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse, ORJSONResponse
+import orjson
 
 from tortoise.expressions import Q
 from tortoise.exceptions import DoesNotExist
 
 # models
-from app.models.applicant import Applicant, applicant_pydantic
+from app.models.applicant import Applicant, applicant_pydantic, applicant_fieldsets, applicant_sort_keys, applicant_columns
 from app.models.organization import Organization
+from app.models.upload_session import UploadSession
+from app.models.translation_job import TranslationJob
 
 # schema
-from app.models.applicant_schema import ApplicantSchema, UpdateApplicantSchema, CreateApplicantToken
+from app.models.applicant_schema import ApplicantSchema, UpdateApplicantSchema, CreateApplicantToken, PresignUploadRequest, FinalizeUploadRequest, CreateUploadSessionRequest
 
 # mailing
 
 # helpers
-from app.helpers.s3_file_upload import upload_file_to_s3, generate_s3_url, is_file_exists, upload_image_to_s3
+from app.helpers.content_store import store_files_async, index_stored_files
+from app.helpers.upload_validation import validate_uploads, check_content, sniff_size, image_types, video_types, document_types
+from app.helpers.s3_file_upload import PresignUnsupported, is_file_exists_async, generate_presigned_upload_async, \
+    download_file_from_s3_async, delete_file_from_s3_async, read_file_head_async, create_multipart_upload_async, \
+    presigned_upload_part_async, list_multipart_parts_async, complete_multipart_upload_async, abort_multipart_upload_async
+from app.helpers.media import media_url, resolve_applicant_media, applicant_media_keys
+from app.helpers.image_variants import build_image_variants_async, upload_image_variants, existing_image_variants, \
+    is_image_key
 from app.auth.authentication import hash_password, applicant_token_generator, verify_token_applicant_email
-from app.helpers.translator import Translator
+from app.helpers.applicant_translation import translate_applicant
+from app.helpers.translation_jobs import enqueue_translation_job, translation_job_status
+from app.helpers.applicant_search import search_applicants
+from app.helpers.cache import response_cache
+from app.helpers.etag import conditional_json_response, make_etag, etag_matches, not_modified
+from app.helpers.pagination import encode_cursor, decode_cursor, split_page, cursor_value, keyset_filter
 
 # mail
 from app.helpers.mailer import Mailer, EmailSchema
@@ -55,7 +72,21 @@ s3_applicant_photos_upload_folder = 'uploads/applicant/photos/'
 s3_applicant_videos_upload_folder = 'uploads/applicant/videos/'
 s3_applicant_licenses_upload_folder = 'uploads/applicant/licenses/'
 
-fjl_cdn = 'https://d1l1wfoqw8757j.cloudfront.net/'
+image_content_types = ['image/jpeg', 'image/png']
+video_content_types = ['video/mp4', 'video/quicktime', 'video/x-msvideo']
+
+# direct-to-s3 uploads: kind -> (folder, allowed content types, max size in bytes)
+applicant_upload_kinds = {
+    'display_photo': (s3_applicant_image_upload_folder, image_content_types, 10 * 1024 * 1024),
+    'photo': (s3_applicant_photos_upload_folder, image_content_types, 10 * 1024 * 1024),
+    'video': (s3_applicant_videos_upload_folder, video_content_types, 500 * 1024 * 1024),
+    'license': (s3_applicant_licenses_upload_folder, ['application/pdf'] + image_content_types, 10 * 1024 * 1024),
+}
+
+# resumable video uploads send one multipart part per chunk straight to s3, which
+# needs every part except the last to be at least 5 MB
+upload_session_chunk_size = max(5, int(os.getenv("UPLOAD_SESSION_CHUNK_MB", "8"))) * 1024 * 1024
+upload_session_part_expires = int(os.getenv("UPLOAD_SESSION_PART_URL_SECONDS", "3600"))
 
 router = APIRouter(
     prefix="/applicant",
@@ -69,47 +100,204 @@ logger = logging.getLogger(__name__)
 
 
 
+def applicant_filters(
+        nationality: Optional[List[str]] = Query(None),
+        gender: Optional[List[str]] = Query(None),
+        jlpt: Optional[List[str]] = Query(None),
+        jft: Optional[List[str]] = Query(None),
+        visa: Optional[List[str]] = Query(None),
+        result: Optional[List[str]] = Query(None),
+        recruiter: Optional[List[str]] = Query(None),
+        organization: Optional[List[str]] = Query(None),
+        interview_date_from: Optional[date] = None,
+        interview_date_to: Optional[date] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None) -> dict:
+    # query params -> tortoise filter kwargs, repeat a param to match any of several values
+    filters = {}
+
+    for field, values in (('nationality', nationality), ('gender', gender), ('jlpt', jlpt), ('jft', jft),
+                          ('visa', visa), ('result', result), ('recruiter', recruiter), ('organization', organization)):
+        if values:
+            filters[f'{field}__in'] = values
+
+    if interview_date_from:
+        filters['interview_date__gte'] = interview_date_from
+    if interview_date_to:
+        filters['interview_date__lte'] = interview_date_to
+    if created_from:
+        filters['created_at__gte'] = created_from
+    if created_to:
+        filters['created_at__lte'] = created_to
+
+    return filters
+
+
+def resolve_applicant_sort(sort: str):
+    # "-created_at" sorts newest first, "last_name" sorts A-Z
+    descending = sort.startswith('-')
+    field = sort.lstrip('-')
+
+    if field not in applicant_sort_keys:
+        raise HTTPException(
+            status_code=400, detail=f"Invalid sort key. Use one of: {', '.join(applicant_sort_keys)}")
+
+    return field, descending
+
+
 @router.get("/all")
-async def get_applicants():
-    # applicants = await Applicant.all()
-    applicants_list = await applicant_pydantic.from_queryset(Applicant.all())
+async def get_applicants(
+        request: Request,
+        limit: int = Query(50, ge=1, le=500),
+        cursor: Optional[str] = None,
+        fields: Optional[str] = None,
+        sort: str = '-created_at',
+        media: str = Query('thumb', pattern='^(thumb|medium|full)$'),
+        filters: dict = Depends(applicant_filters)):
+    sort_field, descending = resolve_applicant_sort(sort)
+    columns = resolve_applicant_fields(fields, sort_field)
+
+    async def load_page():
+        modified_applicants, next_cursor = await fetch_applicants_page(
+            limit, cursor, columns, filters, sort_field, descending, media)
+
+        return {"items": modified_applicants, "next_cursor": next_cursor}
+
+    cache_key = 'applicant:all:' + json.dumps(
+        [limit, cursor, columns, sort, media, filters], default=str, sort_keys=True)
+
+    return await conditional_json_response(
+        request, cache_key, ['applicant'], Applicant.filter(**filters), load_page)
+
+
+@router.get("/all/stream")
+async def stream_applicants(
+        fields: Optional[str] = None,
+        chunk_size: int = Query(500, ge=1, le=2000),
+        sort: str = '-created_at',
+        media: str = Query('thumb', pattern='^(thumb|medium|full)$'),
+        filters: dict = Depends(applicant_filters)):
+    # same rows as /all, written as one json document per line while the db is
+    # read chunk by chunk, so memory stays at one chunk regardless of table size
+    sort_field, descending = resolve_applicant_sort(sort)
+    columns = resolve_applicant_fields(fields, sort_field)
 
-    # Define json fields only once outside the loop
-    json_fields = ['family', 'education', 'qualifications_licenses',
-                   'unique_questions', 'photos', 'links', 'work_experience', 'required_questions']
+    async def generate_rows():
+        cursor = None
+        while True:
+            applicants_chunk, cursor = await fetch_applicants_page(
+                chunk_size, cursor, columns, filters, sort_field, descending, media)
+
+            for applicant in applicants_chunk:
+                yield orjson.dumps(applicant) + b"\n"
+
+            if cursor is None:
+                break
+
+    return StreamingResponse(generate_rows(), media_type="application/x-ndjson")
+
+
+async def fetch_applicants_page(limit: int, cursor: Optional[str] = None, columns=None, filters: Optional[dict] = None,
+                                sort_field: str = 'created_at', descending: bool = True, media: str = 'thumb'):
+    # keyed on (sort_field, id) so pages stay stable while rows are added
+    queryset = Applicant.filter(**(filters or {}))
+
+    if cursor:
+        value, applicant_id = parse_applicant_cursor(cursor, sort_field)
+        queryset = queryset.filter(keyset_filter(sort_field, value, applicant_id, descending))
+
+    direction = '-' if descending else ''
+    queryset = queryset.order_by(f'{direction}{sort_field}', f'{direction}id').limit(limit + 1)
+
+    # plain dicts straight from the db, with ?fields= only the requested columns
+    # are selected so the large text blobs never leave the db
+    applicants_list = await queryset.values(*(columns or applicant_columns))
+
+    applicants_list, has_more = split_page(applicants_list, limit)
 
     # Use list comprehension to process each applicant
     modified_applicants = [await process_applicant(
-        applicant, json_fields) for applicant in applicants_list]
+        applicant, None if media == 'full' else media) for applicant in applicants_list]
+
+    next_cursor = None
+    if has_more:
+        last = applicants_list[-1]
+        next_cursor = encode_cursor(sort_field, cursor_value(last[sort_field]), str(last['id']))
+
+    return modified_applicants, next_cursor
+
 
-    return modified_applicants
+def resolve_applicant_fields(fields: Optional[str], sort_field: str = 'created_at'):
+    # ?fields= is either a named fieldset (e.g. grid) or a comma separated column list
+    if not fields:
+        return None
 
+    if fields in applicant_fieldsets:
+        columns = list(applicant_fieldsets[fields])
+    else:
+        columns = [column.strip() for column in fields.split(',') if column.strip()]
 
-async def process_applicant(applicant, json_fields):
-    applicant_dict = applicant.dict()  # Convert Pydantic model to dict
+    unknown = [column for column in columns if column not in applicant_pydantic.model_fields]
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown applicant fields: {', '.join(unknown)}")
+
+    # the cursor is built from these, so they are always selected
+    for column in ('id', 'created_at', sort_field):
+        if column not in columns:
+            columns.append(column)
+
+    # needed to swap photos for their thumbnails
+    if ('img_url' in columns or 'photos' in columns) and 'media_variants' not in columns:
+        columns.append('media_variants')
+
+    return tuple(columns)
+
+
+def parse_applicant_cursor(cursor: str, sort_field: str):
+    values = decode_cursor(cursor)
+
+    try:
+        cursor_sort_field, value, applicant_id = values
+        if cursor_sort_field != sort_field:
+            raise ValueError("cursor was issued for a different sort")
+
+        if value is not None:
+            value = applicant_sort_keys[sort_field](value)
+
+        return value, str(UUID(applicant_id))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+
+@router.get("/search", response_class=ORJSONResponse)
+async def search_applicant_text(
+        q: str = Query(..., min_length=1, max_length=200),
+        lang: str = Query('en', pattern='^(en|ja)$'),
+        limit: int = Query(20, ge=1, le=100),
+        offset: int = Query(0, ge=0)):
+    # en searches the english free text fields, ja the translated ja_ ones
+    q = q.strip()
+    if not q:
+        raise HTTPException(status_code=400, detail="Search query is empty.")
 
-    # Efficiently handle JSON parsing
-    for field in json_fields:
-        field_value = applicant_dict.get(field)
-        if field_value is not None:
-            applicant_dict[field] = json.loads(field_value)
+    rows = await search_applicants(q, lang, limit + 1, offset)
 
+    rows, has_more = split_page(rows, limit)
+
+    for row in rows:
+        row['img_url'] = media_url(row.get('img_url'))
+
+    return ORJSONResponse({"items": rows, "next_offset": offset + limit if has_more else None})
+
+
+async def process_applicant(applicant_dict: dict, variant: Optional[str] = None):
     # Modify 'required_questions' if applicable
     # if applicant_dict.get('required_questions') is not None:
     #     modify_required_questions(applicant_dict)
 
-    # Replace the S3 bucket URL with the CDN URL for 'img_url'
-    img_url = applicant_dict.get('img_url')
-    if img_url:
-        applicant_dict['img_url'] = img_url.replace(
-            'https://fjl-bucket.s3.amazonaws.com/', fjl_cdn)
-
-    # photos too
-    if applicant_dict.get('photos'):
-        applicant_dict['photos'] = [photo.replace(
-            'https://fjl-bucket.s3.amazonaws.com/', fjl_cdn) for photo in applicant_dict['photos']]
-
-    return applicant_dict
+    # stored object keys -> cdn urls for img_url, photos and license files
+    return resolve_applicant_media(applicant_dict, variant)
 
 
 # async def get_image_as_base64(url):
@@ -139,7 +327,7 @@ def modify_required_questions(applicant_dict):
 
 
 @router.get("/get_applicant_info", name="Get applicant by authkey")
-async def get_applicant_by_authkey(token: str):
+async def get_applicant_by_authkey(token: str, request: Request, response: Response):
 
     applicant = await verify_token_applicant_email(token)
 
@@ -150,6 +338,15 @@ async def get_applicant_by_authkey(token: str):
             headers={"WWW-Authenticate": "Bearer"}
         )
 
+    # the row is already loaded for the token check, its version decides the etag.
+    # version stays 0 without the migration 0005 trigger, then there is no etag
+    if applicant.version:
+        etag = make_etag('applicant', applicant.id, applicant.version)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        response.headers['ETag'] = etag
+
     # Convert the ORM model instance to a Pydantic model instance
     pydantic_applicant = await applicant_pydantic.from_tortoise_orm(applicant)
 
@@ -157,21 +354,6 @@ async def get_applicant_by_authkey(token: str):
     # applicant_dict = pydantic_applicant.dict()
     applicant_dict = pydantic_applicant.model_dump()
 
-    # Now you can manipulate your data
-    applicant_dict['qualifications_licenses'] = json.loads(
-        applicant_dict['qualifications_licenses'])
-    # applicant_dict['photos'] = json.loads(applicant_dict['photos'])
-    applicant_dict['work_experience'] = json.loads(
-        applicant_dict['work_experience'])
-    applicant_dict['education'] = json.loads(applicant_dict['education'])
-    applicant_dict['family'] = json.loads(applicant_dict['family'])
-    # applicant_dict['links'] = json.loads(applicant_dict['links'])
-    applicant_dict['unique_questions'] = json.loads(
-        applicant_dict['unique_questions'])
-
-    applicant_dict['required_questions'] = json.loads(
-        applicant_dict['required_questions'])
-
     has_family = applicant_dict['family'] is not None and len(
         applicant_dict['family']) > 0
 
@@ -194,15 +376,8 @@ async def get_applicant_by_authkey(token: str):
     #         applicant_dict['required_questions'][i]['id'] = str(
     #             int(applicant_dict['required_questions'][i]['id']) + 1)  # Increment IDs by 1
 
-    if applicant_dict['photos']:
-        applicant_dict['photos'] = json.loads(applicant_dict['photos'])
-
-    # switch the s3 bucket url to the cdn url
-    if 'img_url' in applicant_dict:
-        applicant_dict['img_url'] = applicant_dict['img_url'].replace(
-            'https://fjl-bucket.s3.amazonaws.com/', fjl_cdn)
-
-    return applicant_dict
+    # stored object keys -> cdn urls
+    return resolve_applicant_media(applicant_dict)
 
 
 @router.post("/login", status_code=status.HTTP_200_OK)
@@ -236,6 +411,10 @@ async def create_applicant(
         raise HTTPException(
             status_code=400, detail="Incorrect JSON format in applicant data.")
 
+    # real type and size of every file, before anything is processed or uploaded
+    validate_uploads(licenses, image_types + document_types)
+    validate_uploads(photos, image_types + video_types)
+
     # check email if already exists, if its throw error
     if await Applicant.filter(email=applicant_data['email']).exists():
         logger.warning("Email already exists.")
@@ -261,7 +440,6 @@ async def create_applicant(
     details.pop("password")
 
     # we will add the image url, files to the details after we upload the files to s3
-    now = datetime.now()
 
     # Upload the display photo to S3
     # if applicant.display_photo is not None:
@@ -287,63 +465,21 @@ async def create_applicant(
     #     details['img_url'] = s3_read_url
     #     print("Successfully uploaded display photo to s3")
 
-    if details['work_experience'] is not None:
-        details['work_experience'] = json.dumps(
-            details['work_experience'])
-
-        logger.info("Successfully stringified work experience to JSON")
-
-    if details['education'] is not None:
-        details['education'] = json.dumps(details['education'])
-
-        logger.info("Successfully stringified education to JSON")
-
-    if details['family'] is not None:
-        details['family'] = json.dumps(details['family'])
-
-        logger.info("Successfully stringified family to JSON")
-
-    if details['unique_questions'] is not None:
-        details['unique_questions'] = json.dumps(
-            details['unique_questions'])
-
-        logger.info("Successfully stringified unique questions to JSON")
-
-    if details['required_questions'] is not None:
-        details['required_questions'] = json.dumps(
-            details['required_questions'])
-
-        logger.info("Successfully stringified required questions to JSON")
-
     # if details['links'] is not None:
     #     details['links'] = json.dumps(details['links'])
 
+    # licenses and photos are collected first and uploaded in one parallel stage below
+    license_uploads = []
+    photo_uploads = []
+    photo_variants = ImageVariantCollector(s3_applicant_photos_upload_folder)
+
     # licenses
     if applicant.licenses is not None:
         if 'qualifications_licenses' not in details:
             details['qualifications_licenses'] = []
 
         for file in applicant.licenses:
-
-            new_file_name = file.filename.split(
-                '.')[0] + now.strftime("_%Y%m%d_%H%M%S") + '.' + file.filename.split('.')[-1]
-
-            upload_file_to_s3(file, new_file_name,
-                              s3_applicant_licenses_upload_folder)
-
-            s3_file_path = s3_applicant_licenses_upload_folder + new_file_name
-
-            s3_read_url = generate_s3_url(s3_file_path, 'read')
-
-            details['qualifications_licenses'][applicant.licenses.index(
-                file)]['file'] = s3_read_url
-            
-
-        # dump the details to json
-        details['qualifications_licenses'] = json.dumps(
-            details['qualifications_licenses'])
-
-        logger.info("Successfully uploaded licenses to S3")
+            license_uploads.append((file, s3_applicant_licenses_upload_folder))
 
     # photos
     # if applicant.photos is not None:
@@ -379,27 +515,36 @@ async def create_applicant(
 
             folder_path = s3_applicant_videos_upload_folder if is_video else s3_applicant_photos_upload_folder
 
-            file_type_label = 'video' if is_video else 'pic'
-            # Retrieve first_name and last_name from the details
-            first_name = details.get('first_name', 'unknown')
-            last_name = details.get('last_name', 'unknown')
+            # the object key is the content hash, see app/helpers/content_store.py
+            photo_uploads.append((file, folder_path))
 
-            # new_file_name = f"{file.filename.split('.')[0]}{now.strftime('_%Y%m%d_%H%M%S')}.{file.filename.split('.')[-1]}"
-            new_file_name = f"{first_name}_{last_name}_{file_type_label}_{now.strftime('%Y%m%d_%H%M%S')}.{file.filename.split('.')[-1]}"
-            upload_file_to_s3(file, new_file_name, folder_path)
-            s3_file_path = folder_path + new_file_name
-            s3_read_url = generate_s3_url(s3_file_path, 'read')
+    try:
+        # photo renditions are built in the same bounded stage, before the upload closes the file
+        uploaded_keys, stored_files = await store_files_async(license_uploads + photo_uploads, prepare=photo_variants)
+    except Exception as e:
+        logger.error(f"Media upload failed: {e}")
+        raise HTTPException(
+            status_code=502, detail="There was an error uploading the files, the applicant was not created.")
 
-            details['photos'].append(s3_read_url)
+    # results come back in input order, licenses are matched to qualifications_licenses by index
+    for index, s3_file_path in enumerate(uploaded_keys[:len(license_uploads)]):
+        details['qualifications_licenses'][index]['file'] = s3_file_path
 
-        # Dump the photo URLs to JSON
-        details['photos'] = json.dumps(details['photos'])
+    if photo_uploads:
+        photo_keys = uploaded_keys[len(license_uploads):]
+        details['photos'].extend(photo_keys)
+        details['media_variants'] = await photo_variants.media_variants(photo_keys)
 
-        logger.info("Successfully uploaded photos to S3")
+    logger.info("Successfully uploaded licenses and photos to S3")
 
     # Create the applicant instance
     applicant = await Applicant.create(**details)
 
+    # the new objects become dedup targets only now that a row points to them
+    await index_stored_files(stored_files)
+
+    await response_cache.invalidate('applicant')
+
     new_applicant = await applicant_pydantic.from_tortoise_orm(applicant)
 
     logger.info("Applicant created successfully")
@@ -410,6 +555,69 @@ async def create_applicant(
     # return {"msg": "Applicant created successfully", "applicant": applicant}
 
 
+async def prepare_image_variants(file):
+    # a photo Pillow can't read is still uploaded, just without renditions
+    try:
+        return await build_image_variants_async(file.file)
+    except Exception as e:
+        logger.warning(f"Could not build image variants for {file.filename}: {e}")
+        return None
+
+
+async def prepare_image_variants_from_key(s3_file_path):
+    try:
+        data = await download_file_from_s3_async(s3_file_path)
+        return await build_image_variants_async(BytesIO(data))
+    except Exception as e:
+        logger.warning(f"Could not build image variants for {s3_file_path}: {e}")
+        return None
+
+
+async def store_image_variants(pending):
+    # (original key, rendition bytes) pairs -> media_variants entries
+    media_variants = {}
+    for s3_file_path, variants in pending:
+        if not variants:
+            continue
+        try:
+            media_variants[s3_file_path] = await upload_image_variants(s3_file_path, variants)
+        except Exception as e:
+            logger.warning(f"Could not upload image variants for {s3_file_path}: {e}")
+
+    return media_variants
+
+
+class ImageVariantCollector:
+    # prepare hook for store_files_async. renditions of the images stored under
+    # folder_path are built inside the bounded upload stage while the spooled file
+    # is still open. keys that already have renditions, on the row or in storage
+    # from an earlier upload of the same content, are reused and not built again
+    def __init__(self, folder_path, media_variants=None):
+        self.folder_path = folder_path
+        self.known = dict(media_variants or {})
+        self.pending = {}
+
+    async def __call__(self, file_object, key):
+        if not key.startswith(self.folder_path) or not is_image_key(key):
+            return
+        if key in self.known or key in self.pending:
+            return
+
+        # claimed before awaiting, the same photo twice in one request is built once
+        self.pending[key] = None
+        existing = await existing_image_variants(key)
+        if existing:
+            del self.pending[key]
+            self.known[key] = existing
+        else:
+            self.pending[key] = await prepare_image_variants(file_object)
+
+    async def media_variants(self, keys) -> dict:
+        # media_variants entries for keys, renditions built in this request are uploaded first
+        variants = {**self.known, **await store_image_variants(self.pending.items())}
+        return {key: variants[key] for key in keys if key in variants}
+
+
 @router.put("/admin_edit_applicant")
 async def admin_edit_applicant(data: str = Form(...)):
     applicant_info = json.loads(data)
@@ -429,10 +637,18 @@ async def admin_edit_applicant(data: str = Form(...)):
 
     # pop id
     data_copy.pop('id')
+    data_copy.pop('media_variants', None)
+    # a row from /all sent back as is also carries what the database maintains
+    for field in ('created_at', 'version'):
+        data_copy.pop(field, None)
+
+    applicant_media_keys(data_copy, applicant.media_variants)
 
     # Update the applicant
     updated = await Applicant.filter(id=applicant_info['id']).update(**data_copy)
 
+    await response_cache.invalidate('applicant')
+
     if not updated:
         raise HTTPException(
             status_code=500, detail="There was an error updating the applicant.")
@@ -452,6 +668,10 @@ async def update_applicant(applicant_json: str = Form(...), display_photo: Uploa
         raise HTTPException(
             status_code=400, detail="Incorrect JSON format in applicant data.")
 
+    # licenses already uploaded come back as strings and are skipped
+    validate_uploads([display_photo] if display_photo is not None else [], image_types)
+    validate_uploads(licenses, image_types + document_types)
+
     applicant = UpdateApplicantSchema(
         applicant_json=applicant_data,
         display_photo=display_photo,
@@ -460,226 +680,413 @@ async def update_applicant(applicant_json: str = Form(...), display_photo: Uploa
 
     details = applicant.applicant_json
 
-    now = datetime.now()
+    # media_variants is maintained here, never taken from the client
+    details.pop('media_variants', None)
+    media_variants = await Applicant.filter(id=details['id']).first().values_list('media_variants', flat=True)
+
+    # the client sends back the cdn urls it was given, store keys again
+    applicant_media_keys(details, media_variants)
+
+    # display photo and new licenses go up in one parallel stage, upload_targets
+    # remembers where each resulting key belongs
+    uploads = []
+    upload_targets = []
+    display_photo_variants = ImageVariantCollector(s3_applicant_image_upload_folder, media_variants)
+
     if display_photo is not None:
+        # an unchanged photo hashes to the key it already has and is not uploaded again
+        uploads.append((display_photo, s3_applicant_image_upload_folder))
+        upload_targets.append(('img_url', None))
+
+    if applicant.licenses is not None:
+        if 'qualifications_licenses' not in details:
+            details['qualifications_licenses'] = []
+
+        for index, file in enumerate(applicant.licenses):
+            # check first if the file is a string, if it is, it means there is already a file uploaded, so do nothing
+            if isinstance(file, str):
+                pass
+            else:
+                uploads.append((file, s3_applicant_licenses_upload_folder))
+                upload_targets.append(('qualifications_licenses', index))
+
+    try:
+        uploaded_keys, stored_files = await store_files_async(uploads, prepare=display_photo_variants)
+    except Exception as e:
+        logger.error(f"Media upload failed: {e}")
+        raise HTTPException(
+            status_code=502, detail="There was an error uploading the files, the applicant was not updated.")
 
-        first_name = str(details.get('first_name', 'unknown')).lower()
-        last_name = str(details.get('last_name', 'unknown')).lower()
+    for (field, index), s3_file_path in zip(upload_targets, uploaded_keys):
+        if field == 'img_url':
+            details['img_url'] = s3_file_path
+        else:
+            details['qualifications_licenses'][index]['file'] = s3_file_path
 
-        # get the file type
-        file_type = applicant.display_photo.filename.split(
-            '.')[-1] if applicant.display_photo.filename else 'jpg'
+    # renditions of a photo the row already had are kept as they are
+    if display_photo is not None and details['img_url'] not in (media_variants or {}):
+        new_variants = await display_photo_variants.media_variants([details['img_url']])
+        if new_variants:
+            details['media_variants'] = {**(media_variants or {}), **new_variants}
 
-        image_name = f"{last_name}_{first_name}_{now.strftime('%Y%m%d_%H%M%S')}.{file_type}"
+    if uploads:
+        logger.info("Successfully uploaded display photo and licenses to S3")
 
-        # image_name = f"{details['last_name']}_{details['first_name']}_dp_{now.strftime('%Y%m%d_%H%M%S')}.jpg"
+    data_copy = details.copy()
 
-        # upload_file_to_s3(display_photo, image_name,
-        #                   s3_applicant_image_upload_folder)
+    # print("Data copy: ", data_copy)
 
-        # s3_img_path = s3_applicant_image_upload_folder + image_name
+    # pop id
+    data_copy.pop('id')
+    # pop password
+    data_copy.pop('password')
+    data_copy.pop('has_family')
 
-        upload_file_to_s3(display_photo, image_name,
-                          s3_applicant_image_upload_folder)
+    # Update the applicant
+    updated = await Applicant.filter(id=details['id']).update(**data_copy)
 
-        s3_img_path = s3_applicant_image_upload_folder + image_name
+    await response_cache.invalidate('applicant')
 
-        s3_read_url = generate_s3_url(s3_img_path, 'read')
+    if not updated:
+        raise HTTPException(
+            status_code=500, detail="There was an error updating the applicant.")
 
-        details['img_url'] = s3_read_url
-        print("Successfully uploaded display photo to s3")
+    await index_stored_files(stored_files)
 
-    if details['work_experience'] is not None:
-        details['work_experience'] = json.dumps(
-            details['work_experience'])
+    return {"msg": "Applicant updated successfully."}
 
-        print("Successfully stringified work experience to json")
+# direct-to-s3 media uploads
+#
+# 1. /uploads/presign returns a presigned POST per file
+# 2. the browser posts each file straight to the bucket
+# 3. /uploads/finalize checks the objects exist and records the keys on the applicant
 
-    if details['education'] is not None:
-        details['education'] = json.dumps(details['education'])
 
-        print("Successfully stringified education to json")
+@router.post("/uploads/presign")
+async def presign_applicant_uploads(upload_request: PresignUploadRequest):
+    if not await Applicant.filter(id=upload_request.applicant_id).exists():
+        raise HTTPException(status_code=404, detail="Applicant not found.")
 
-    if details['family'] is not None:
-        details['family'] = json.dumps(details['family'])
+    uploads = []
+    for file in upload_request.files:
+        folder_path, content_types, max_size = applicant_upload_kinds[file.kind]
 
-        print("Successfully stringified family to json")
+        if file.content_type not in content_types:
+            raise HTTPException(
+                status_code=400, detail=f"Invalid file type for {file.kind}: {file.content_type}")
 
-    if details['unique_questions'] is not None:
-        details['unique_questions'] = json.dumps(
-            details['unique_questions'])
+        if file.size > max_size:
+            raise HTTPException(
+                status_code=413, detail=f"{file.filename} is larger than {max_size // (1024 * 1024)} MB.")
 
-        print("Successfully stringified unique questions to json")
+        extension = file.filename.rsplit('.', 1)[-1].lower() if '.' in file.filename else 'bin'
+        s3_file_path = f"{folder_path}{upload_request.applicant_id}/{uuid4().hex}.{extension}"
 
-    if details['required_questions'] is not None:
-        details['required_questions'] = json.dumps(
-            details['required_questions'])
+        try:
+            presigned = await generate_presigned_upload_async(s3_file_path, file.content_type, max_size)
+        except PresignUnsupported as e:
+            raise HTTPException(status_code=501, detail=str(e))
 
-        print("Successfully stringified required questions to json")
+        uploads.append({"kind": file.kind, "key": s3_file_path,
+                        "url": presigned['url'], "fields": presigned['fields']})
 
-    if applicant.licenses is not None:
-        if 'qualifications_licenses' not in details:
-            details['qualifications_licenses'] = []
+    return {"uploads": uploads}
 
-        for file in applicant.licenses:
-            print(file)
-            # check first if the file is a string, if it is, it means there is already a file uploaded, so do nothing
-            if isinstance(file, str):
-                pass
-            else:
-                new_file_name = file.filename.split(
-                    '.')[0] + now.strftime("_%Y%m%d_%H%M%S") + '.' + file.filename.split('.')[-1]
 
-                upload_file_to_s3(file, new_file_name,
-                                  s3_applicant_licenses_upload_folder)
+@router.post("/uploads/finalize")
+async def finalize_applicant_uploads(finalize_request: FinalizeUploadRequest):
+    try:
+        applicant = await Applicant.get(id=finalize_request.applicant_id)
+    except DoesNotExist:
+        raise HTTPException(status_code=404, detail="Applicant not found.")
 
-                s3_file_path = s3_applicant_licenses_upload_folder + new_file_name
+    for file in finalize_request.files:
+        folder_path = applicant_upload_kinds[file.kind][0]
 
-                s3_read_url = generate_s3_url(s3_file_path, 'read')
+        # only keys handed out by /uploads/presign for this applicant can be attached
+        if not file.key.startswith(f"{folder_path}{applicant.id}/"):
+            raise HTTPException(status_code=400, detail=f"Invalid key for {file.kind}: {file.key}")
 
-                details['qualifications_licenses'][applicant.licenses.index(
-                    file)]['file'] = s3_read_url
+        # every index is checked before anything is applied, a bad one leaves the applicant as it was
+        if file.kind == 'license' and (
+                file.license_index is None or not 0 <= file.license_index < len(applicant.qualifications_licenses or [])):
+            raise HTTPException(
+                status_code=400, detail="license_index does not match a qualification.")
 
-        # dump the details to json
-        details['qualifications_licenses'] = json.dumps(
-            details['qualifications_licenses'])
+    exists = await asyncio.gather(*[is_file_exists_async(file.key) for file in finalize_request.files])
+    missing = [file.key for file, found in zip(finalize_request.files, exists) if not found]
+    if missing:
+        raise HTTPException(
+            status_code=400, detail=f"Files were not uploaded: {', '.join(missing)}")
+
+    photos = list(applicant.photos or [])
+    licenses = list(applicant.qualifications_licenses or [])
+    media_variants = dict(applicant.media_variants or {})
+
+    # finalizing the same keys again changes nothing, keys already attached are skipped
+    for file in finalize_request.files:
+        if file.kind in ('display_photo', 'photo') and file.key not in media_variants:
+            # the image never passed through the api, fetch it once to build its renditions
+            variants = await prepare_image_variants_from_key(file.key)
+            media_variants.update(await store_image_variants([(file.key, variants)]))
+
+        if file.kind == 'display_photo':
+            applicant.img_url = file.key
+        elif file.kind in ('photo', 'video'):
+            if file.key not in photos:
+                photos.append(file.key)
+        else:
+            licenses[file.license_index]['file'] = file.key
+
+    applicant.photos = photos
+    applicant.qualifications_licenses = licenses
+    applicant.media_variants = media_variants
+    await applicant.save(update_fields=['img_url', 'photos', 'qualifications_licenses', 'media_variants'])
+
+    await response_cache.invalidate('applicant')
+
+    return resolve_applicant_media({
+        "id": applicant.id,
+        "img_url": applicant.img_url,
+        "photos": applicant.photos,
+        "qualifications_licenses": applicant.qualifications_licenses,
+        "media_variants": applicant.media_variants,
+    })
+
+
+# resumable video uploads, for connections that can't be trusted with a whole video.
+# the parts go from the client straight to s3, a chunk never passes through the
+# api (a lambda request body is capped at 6 MB)
+# 1. POST /uploads/sessions opens a multipart upload and returns the chunk size and part count
+# 2. POST /uploads/sessions/{id}/parts/{n} returns a presigned url, the client PUTs bytes
+#    [(n - 1) * chunk_size, n * chunk_size) of the file to it
+# 3. GET /uploads/sessions/{id} lists the parts s3 has, the client resends the missing ones
+# 4. POST /uploads/sessions/{id}/complete assembles the parts and adds the video to photos
+
+
+def upload_session_part_count(session: UploadSession) -> int:
+    return -(-session.size // session.chunk_size)
+
+
+def upload_session_part_size(session: UploadSession, part_number: int) -> int:
+    return min(session.chunk_size, session.size - (part_number - 1) * session.chunk_size)
+
+
+def upload_session_status(session: UploadSession) -> dict:
+    received_parts = {part_number for part_number, _ in session.parts}
+    return {
+        "id": session.id,
+        "key": session.key,
+        "size": session.size,
+        "chunk_size": session.chunk_size,
+        "part_count": upload_session_part_count(session),
+        "received": session.received,
+        "missing_parts": [part_number for part_number in range(1, upload_session_part_count(session) + 1)
+                          if part_number not in received_parts],
+        "status": session.status,
+    }
 
-        print("Successfully uploaded licenses to s3")
 
-    data_copy = details.copy()
+async def get_open_upload_session(session_id: UUID) -> UploadSession:
+    session = await UploadSession.get_or_none(id=session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Upload session not found.")
+    if session.status != 'open':
+        raise HTTPException(status_code=409, detail=f"Upload session is {session.status}.")
+    return session
 
-    # print("Data copy: ", data_copy)
 
-    # pop id
-    data_copy.pop('id')
-    # pop password
-    data_copy.pop('password')
-    data_copy.pop('has_family')
+async def sync_upload_session_parts(session: UploadSession):
+    # the client talks to s3 directly, the parts and their etags are read back
+    # from there. a part of the wrong size doesn't count and has to be sent again
+    try:
+        stored_parts = await list_multipart_parts_async(session.key, session.upload_id)
+    except Exception as e:
+        logger.error(f"Upload session {session.id} parts could not be listed: {e}")
+        raise HTTPException(status_code=502, detail="There was an error reading the upload.")
 
-    # Update the applicant
-    updated = await Applicant.filter(id=details['id']).update(**data_copy)
+    part_count = upload_session_part_count(session)
+    parts = [[part_number, etag] for part_number, etag, size in stored_parts
+             if 1 <= part_number <= part_count and size == upload_session_part_size(session, part_number)]
 
-    if not updated:
+    session.parts = sorted(parts)
+    session.received = sum(upload_session_part_size(session, part_number) for part_number, _ in parts)
+    await UploadSession.filter(id=session.id, status='open').update(parts=session.parts, received=session.received)
+
+
+@router.post("/uploads/sessions", status_code=201)
+async def create_upload_session(session_request: CreateUploadSessionRequest):
+    if not await Applicant.filter(id=session_request.applicant_id).exists():
+        raise HTTPException(status_code=404, detail="Applicant not found.")
+
+    folder_path, content_types, max_size = applicant_upload_kinds['video']
+
+    if session_request.content_type not in content_types:
         raise HTTPException(
-            status_code=500, detail="There was an error updating the applicant.")
+            status_code=400, detail=f"Invalid file type for video: {session_request.content_type}")
+
+    if session_request.size <= 0:
+        raise HTTPException(status_code=400, detail="size must be greater than 0.")
+
+    if session_request.size > max_size:
+        raise HTTPException(
+            status_code=413, detail=f"{session_request.filename} is larger than {max_size // (1024 * 1024)} MB.")
+
+    extension = session_request.filename.rsplit('.', 1)[-1].lower() if '.' in session_request.filename else 'bin'
+    s3_file_path = f"{folder_path}{session_request.applicant_id}/{uuid4().hex}.{extension}"
+
+    try:
+        upload_id = await create_multipart_upload_async(s3_file_path, session_request.content_type)
+    except PresignUnsupported as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+    session = await UploadSession.create(
+        applicant_id=session_request.applicant_id,
+        key=s3_file_path,
+        content_type=session_request.content_type,
+        size=session_request.size,
+        chunk_size=upload_session_chunk_size,
+        upload_id=upload_id,
+    )
+
+    return upload_session_status(session)
+
+
+@router.get("/uploads/sessions/{session_id}")
+async def get_upload_session(session_id: UUID):
+    session = await UploadSession.get_or_none(id=session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Upload session not found.")
+
+    if session.status == 'open':
+        await sync_upload_session_parts(session)
+
+    return upload_session_status(session)
+
+
+@router.post("/uploads/sessions/{session_id}/parts/{part_number}")
+async def presign_upload_session_part(session_id: UUID, part_number: int):
+    session = await get_open_upload_session(session_id)
+
+    if not 1 <= part_number <= upload_session_part_count(session):
+        raise HTTPException(
+            status_code=400, detail=f"part_number must be between 1 and {upload_session_part_count(session)}.")
+
+    try:
+        url = await presigned_upload_part_async(session.key, session.upload_id, part_number, upload_session_part_expires)
+    except PresignUnsupported as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+    return {
+        "part_number": part_number,
+        "url": url,
+        "offset": (part_number - 1) * session.chunk_size,
+        "size": upload_session_part_size(session, part_number),
+        "expires_in": upload_session_part_expires,
+    }
+
+
+@router.post("/uploads/sessions/{session_id}/complete")
+async def complete_upload_session(session_id: UUID):
+    session = await get_open_upload_session(session_id)
+
+    await sync_upload_session_parts(session)
+
+    if session.received != session.size:
+        raise HTTPException(status_code=409, detail={
+            "message": "Upload is not finished.", "missing_parts": upload_session_status(session)["missing_parts"]})
+
+    # nothing is assembled for an applicant that is gone, the parts stay until the session is aborted
+    if not await Applicant.filter(id=session.applicant_id).exists():
+        raise HTTPException(status_code=404, detail="Applicant not found.")
+
+    # claim the session so a repeated complete can't add the video twice
+    if not await UploadSession.filter(id=session.id, status='open').update(status='complete'):
+        raise HTTPException(status_code=409, detail="Upload session is already completed.")
+
+    try:
+        await complete_multipart_upload_async(session.key, session.upload_id, session.parts)
+    except Exception as e:
+        logger.error(f"Upload session {session.id} could not be completed: {e}")
+        await UploadSession.filter(id=session.id).update(status='open')
+        raise HTTPException(status_code=502, detail="There was an error assembling the upload.")
+
+    # the bytes never passed through the api, check the assembled file is really
+    # the declared video type before it is attached to the applicant
+    try:
+        check_content(await read_file_head_async(session.key, sniff_size), session.content_type, video_types, 'video')
+    except HTTPException:
+        await delete_file_from_s3_async(session.key)
+        await UploadSession.filter(id=session.id).update(status='aborted')
+        raise
+
+    try:
+        applicant = await Applicant.get(id=session.applicant_id)
+    except DoesNotExist:
+        # deleted while the parts were assembled, don't leave the video behind
+        await delete_file_from_s3_async(session.key)
+        await UploadSession.filter(id=session.id).update(status='aborted')
+        raise HTTPException(status_code=404, detail="Applicant not found.")
+
+    applicant.photos = list(applicant.photos or []) + [session.key]
+    await applicant.save(update_fields=['photos'])
+
+    await response_cache.invalidate('applicant')
+
+    return resolve_applicant_media({"id": applicant.id, "photos": applicant.photos})
+
+
+@router.delete("/uploads/sessions/{session_id}")
+async def abort_upload_session(session_id: UUID):
+    session = await get_open_upload_session(session_id)
+
+    await abort_multipart_upload_async(session.key, session.upload_id)
+    await UploadSession.filter(id=session.id).update(status='aborted')
+
+    return {"id": session.id, "status": "aborted"}
 
-    return {"msg": "Applicant updated successfully."}
 
 # deepl translate
 
 
 @router.put("/applicant_pdf_translate")
-async def applicant_pdf_translate(data: str = Form(...)):
+async def applicant_pdf_translate(data: str = Form(...), background: bool = Query(False), force: bool = Query(False)):
     data = json.loads(data)
     applicant_id = data.get("id")
 
     if not applicant_id:
         raise HTTPException(status_code=400, detail="Applicant ID is required")
 
-    try:
-        applicant = await Applicant.get(id=applicant_id)
-    except DoesNotExist:
+    if not await Applicant.filter(id=applicant_id).exists():
         raise HTTPException(status_code=404, detail="Applicant not found")
 
-    # Fields to translate
-    fields_to_translate = [
-        "first_name", "last_name", "middle_name", "other_skills",
-        "self_introduction", "reason_for_application",
-        "past_experience", "future_career_plan"
-    ]
-
-    translator = Translator()
+    # job mode, deepl runs in a background worker and the client polls the job
+    if background:
+        job = await enqueue_translation_job(applicant_id, data.get("unique_questions", []), force)
+        return JSONResponse(status_code=202, content={
+            "job_id": str(job.id),
+            "status": job.status,
+            "status_url": router.url_path_for("get_translation_job", job_id=str(job.id)),
+        })
 
     try:
-        # Translate each field and update the corresponding 'ja_' field
-        for field in fields_to_translate:
-            original_text = getattr(applicant, field)
-            if original_text:
-                translated_text = translator.translate(
-                    original_text, target_lang="JA").text  # Extract text here
-
-                setattr(applicant, f"ja_{field}", translated_text)
-
-        # Special handling for unique_questions
-        unique_questions = data.get("unique_questions", [])
-        translated_questions = []
-        for question in unique_questions:
-            answer = question.get("answer")
-            if answer:
-                translated_answer = translator.translate(
-                    answer, target_lang="JA").text  # Extract text here
-                question["answer"] = translated_answer
-            translated_questions.append(question)
-
-        setattr(applicant, "ja_unique_questions",
-                json.dumps(translated_questions))
-        # setattr(applicant, "ja_unique_questions",
-        #         json.dumps(translated_questions))
-        setattr(applicant, "is_translated", True)
-
-        await applicant.save()
-
-        # get the new applicant data
-        new_applicant = await applicant_pydantic.from_tortoise_orm(applicant)
-
-        applicant_dict = new_applicant.model_dump()
-
-        # Now you can manipulate your data
-        applicant_dict['qualifications_licenses'] = json.loads(
-            applicant_dict['qualifications_licenses'])
-        # applicant_dict['photos'] = json.loads(applicant_dict['photos'])
-        applicant_dict['work_experience'] = json.loads(
-            applicant_dict['work_experience'])
-        applicant_dict['education'] = json.loads(applicant_dict['education'])
-        applicant_dict['family'] = json.loads(applicant_dict['family'])
-        # applicant_dict['links'] = json.loads(applicant_dict['links'])
-        applicant_dict['unique_questions'] = json.loads(
-            applicant_dict['unique_questions'])
-        
-        if "ja_unique_questions" in applicant_dict:
-            applicant_dict['ja_unique_questions'] = json.loads(
-                applicant_dict['ja_unique_questions'])
-
-        applicant_dict['required_questions'] = json.loads(
-            applicant_dict['required_questions'])
-
-        has_family = applicant_dict['family'] is not None and len(
-            applicant_dict['family']) > 0
-
-        if ('required_questions' in applicant_dict):
-            # on applicant_dict['unique_questions'] add has_family
-            # New question to be inserted
-            new_question = {
-                "id": "4",
-                "question": "日本に友人、知人、親戚がいますか？ (Do you have friends, family/relatives living in Japan?)",
-                "answer": "yes" if has_family else "none"
-            }
-
-            # Insert the new question at the fourth position
-            # Insert at index 3, which is the fourth position
-            applicant_dict['required_questions'].insert(3, new_question)
-
-            # Update the IDs of the subsequent questions
-            # Start from index 4 since we inserted at index 3
-            for i in range(4, len(applicant_dict['required_questions'])):
-                applicant_dict['required_questions'][i]['id'] = str(
-                    int(applicant_dict['required_questions'][i]['id']) + 1)  # Increment IDs by 1
-
-        if applicant_dict['photos']:
-            applicant_dict['photos'] = json.loads(applicant_dict['photos'])
-
-        # switch the s3 bucket url to the cdn url
-        if 'img_url' in applicant_dict:
-            applicant_dict['img_url'] = applicant_dict['img_url'].replace(
-                'https://fjl-bucket.s3.amazonaws.com/', fjl_cdn)
-
-        return applicant_dict
+        # only fields changed since the last run are sent to deepl, force re-translates everything
+        return await translate_applicant(applicant_id, data.get("unique_questions", []), force=force)
 
     except Exception as e:
         # Log the error or handle it as needed
         return {"error": str(e), "message": "Translation failed, no changes were saved."}
 
 
+@router.get("/translation_jobs/{job_id}", name="get_translation_job")
+async def get_translation_job(job_id: UUID):
+    job = await TranslationJob.get_or_none(id=job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Translation job not found")
+
+    return ORJSONResponse(translation_job_status(job))
+
+
 def create_forgot_password_email_body(token):
     return f"""
     <html>
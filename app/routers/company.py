@@ -4,11 +4,13 @@ import os
 import pandas as pd
 
 from typing import List, Type
-from app.helpers.s3_file_upload import generate_s3_url, upload_file_to_s3
+from app.helpers.s3_file_upload import run_in_storage_executor
+from app.helpers.cache import response_cache
+from app.helpers.etag import conditional_json_response
 from app.helpers.generate_docs import fill_application_form, fill_manpower_request_form, fill_employment_contract, fill_recruitment_agreement,generate_default_documents, fill_ssw_company_profile, fill_ssw_list_task_duties, generate_letter_pack
 
 # fast api
-from fastapi import APIRouter, status, HTTPException, File, Form, UploadFile, Response
+from fastapi import APIRouter, status, HTTPException, File, Form, UploadFile, Response, Request
 from fastapi.responses import JSONResponse, FileResponse
 
 from app.models.company import Company, company_pydantic, company_pydantic_in, company_selection_pydantic
@@ -26,21 +28,23 @@ router = APIRouter(
 
 
 @router.get("/all", response_model=List[company_pydantic])
-async def get_companies():
+async def get_companies(request: Request):
     # sample filtering
     # companies = await Company.filter(date__gte=datetime.now() - timedelta(days=7)).all().values()
 
     # make sure order by recent creation with created_at
-    return await company_pydantic.from_queryset(Company.all().order_by('-created_at'))
+    return await conditional_json_response(
+        request, 'company:all', ['company'], Company.all(),
+        lambda: Company.all().order_by('-created_at').values(*company_pydantic.model_fields))
 
 # temporarily, lets add a agency list here for now
 
 
 @router.get("/agencies")
-async def get_agencies():
-    agencies = await agency_pydantic.from_queryset(Agency.all().order_by('-created_at'))
-
-    return agencies
+async def get_agencies(request: Request):
+    return await conditional_json_response(
+        request, 'agency:all', ['agency'], Agency.all(),
+        lambda: Agency.all().order_by('-created_at').values(*agency_pydantic.model_fields))
 
 
 @router.post("/add")
@@ -49,6 +53,8 @@ async def add_company(company_json: str = Form(...)):
 
     company = await Company.create(**data)
 
+    await response_cache.invalidate('company')
+
     # throw exception if company is not created
     # if not company:
     #     raise HTTPException(status_code=500, detail="Company not created")
@@ -66,6 +72,8 @@ async def edit_company(company_json: str = Form(...)):
 
     company = await Company.filter(id=data['id']).update(**data_copy)
 
+    await response_cache.invalidate('company')
+
     # throw exception if company is not updated
     if not company:
         raise HTTPException(status_code=500, detail="Company not updated")
@@ -77,6 +85,8 @@ async def edit_company(company_json: str = Form(...)):
 async def delete_company(company_ids: List[str] = Form(...)):
     deleted_companies = await Company.filter(id__in=company_ids).delete()
 
+    await response_cache.invalidate('company')
+
     # throw exception if company is not deleted
     if deleted_companies == 0:
         raise HTTPException(status_code=500, detail="Company not deleted")
@@ -85,25 +95,17 @@ async def delete_company(company_ids: List[str] = Form(...)):
 
 
 @router.get("/company_select")
-async def get_company_selection():
-    companies = await Company.all()
-
-    companies_list = [await company_selection_pydantic.from_tortoise_orm(company) for company in companies]
-
-    sorted_companies = sorted(companies_list, key=lambda x: x.name_en)
-
-    return sorted_companies
+async def get_company_selection(request: Request):
+    return await conditional_json_response(
+        request, 'company:select', ['company'], Company.all(),
+        lambda: Company.all().order_by('name_en').values(*company_selection_pydantic.model_fields))
 
 
 @router.get("/agency_select")
-async def get_agency_selection():
-    agencies = await Agency.all()
-
-    agencies_list = [await agency_selection_pydantic.from_tortoise_orm(agency) for agency in agencies]
-
-    sorted_agencies = sorted(agencies_list, key=lambda x: x.name)
-
-    return sorted_agencies
+async def get_agency_selection(request: Request):
+    return await conditional_json_response(
+        request, 'agency:select', ['agency'], Agency.all(),
+        lambda: Agency.all().order_by('name').values(*agency_selection_pydantic.model_fields))
 
 
 @router.post("/generate_document")
@@ -115,9 +117,10 @@ async def generate_document(details: str = Form(...)):
         if value is None:
             data[key] = ""
 
+    # document builders are blocking (docx/xlsx + s3 upload), keep them off the event loop
     # Generate default documents for specific document types
     if data['document_type'] in ['aqium_license_copy', 'aqium_representative_passport_copy', 'psw_initial_checklist', 'ssw_initial_checklist']:
-        return generate_default_documents(data['document_type'], data['application_type'])
+        return await run_in_storage_executor(generate_default_documents, data['document_type'], data['application_type'])
 
     
     # Fetch company and agency for other document types
@@ -137,7 +140,7 @@ async def generate_document(details: str = Form(...)):
 
     # Handle different document types
     if data['document_type'] == 'application_form':
-        return fill_application_form(company, agency, data)
+        return await run_in_storage_executor(fill_application_form, company, agency, data)
     elif data['document_type'] == 'manpower_request':
         visa_mapping = {
             'psw': 'Engineer / Specialist in Humanities / International Services',
@@ -146,17 +149,17 @@ async def generate_document(details: str = Form(...)):
             'student': 'Student'
         }
         data['visa_type'] = visa_mapping.get(data['visa_type'], data['visa_type'])
-        return fill_manpower_request_form(company, agency, data)
+        return await run_in_storage_executor(fill_manpower_request_form, company, agency, data)
     elif data['document_type'] == 'employment_contract':
-        return fill_employment_contract(company, agency, data)
+        return await run_in_storage_executor(fill_employment_contract, company, agency, data)
     elif data['document_type'] == 'recruitment_agreement':
-        return fill_recruitment_agreement(company, agency, data)
+        return await run_in_storage_executor(fill_recruitment_agreement, company, agency, data)
     elif data['document_type'] == 'company_profile':
         # ssw company profile
-        return fill_ssw_company_profile(company, agency, data)
+        return await run_in_storage_executor(fill_ssw_company_profile, company, agency, data)
     elif data['document_type'] == 'task_qualification_list':
         # ssw list of tasks and qualifications
-        return fill_ssw_list_task_duties(company, agency, data)
+        return await run_in_storage_executor(fill_ssw_list_task_duties, company, agency, data)
     elif data['document_type'] == 'letter_pack':
         # Configuration for each sheet with the corresponding keys
         sheet_configs = {
@@ -176,6 +179,7 @@ async def generate_document(details: str = Form(...)):
             }
         }
 
+        # xlwings drives a local excel instance and has to stay on the calling thread
         return generate_letter_pack(data, sheet_configs)
     else:
         raise HTTPException(status_code=404, detail="Document type not found")
@@ -1,4 +1,5 @@
 from datetime import datetime
+from uuid import uuid4
 import shutil
 import os
 import time
@@ -11,7 +12,6 @@ from dotenv import load_dotenv
 from typing import List, Type
 from dotenv import load_dotenv
 from app.helpers.definitions import get_directory_path
-from app.helpers.s3_file_upload import upload_image_to_s3
 
 # tortoise
 from tortoise.contrib.fastapi import HTTPNotFoundError
@@ -19,7 +19,7 @@ from tortoise.contrib.fastapi import HTTPNotFoundError
 # fastapi
 from fastapi import APIRouter, Depends, status, Request, HTTPException, File, UploadFile, Form
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 
 # models
 from app.models.interviewee import interviewee_pydantic, Interviewee
@@ -28,7 +28,10 @@ from app.models.interviewee import interviewee_pydantic, Interviewee
 # authentication
 from app.auth.authentication import hash_password, token_generator, verify_password, verify_token_interviewee_email
 
-from app.helpers.s3_file_upload import upload_file_to_s3, generate_s3_url
+from app.helpers.content_store import store_files_async, index_stored_files
+from app.helpers.upload_validation import validate_uploads, image_types
+from app.helpers.s3_file_upload import PresignUnsupported, generate_presigned_upload_async, is_file_exists_async
+from app.helpers.media import media_url
 
 # email user verification
 # from app.auth.email_verification import send_email
@@ -37,12 +40,18 @@ from app.helpers.s3_file_upload import upload_file_to_s3, generate_s3_url
 from app.helpers.mailer import Mailer, EmailSchema
 
 # pydantic interviewee schema
-from app.models.interviewee_schema import Interviewee as IntervieweeSchema
+from app.models.interviewee_schema import Interviewee as IntervieweeSchema, PresignUploadRequest
 
 # s3 bucket directories
 s3_interviewee_image_upload_folder = 'uploads/interview/img/'
 s3_interviewee_rcimage_upload_folder = 'uploads/interview/cardimg/'
 
+# direct-to-s3 uploads: kind -> (folder, details field, max size in bytes)
+interviewee_upload_kinds = {
+    'interviewee_image': (s3_interviewee_image_upload_folder, 'img_url', 10 * 1024 * 1024),
+    'residence_card_image': (s3_interviewee_rcimage_upload_folder, 'residence_card_image', 10 * 1024 * 1024),
+}
+
 router = APIRouter(
     prefix="/interviewees",
     tags=["Interviewees"],
@@ -53,9 +62,11 @@ load_dotenv()
 upload_path = get_directory_path() + '\\uploads'
 
 
-@router.get("", name="Get all interviewees")
+@router.get("", name="Get all interviewees", response_class=ORJSONResponse)
 async def get_interviewees():
-    return await interviewee_pydantic.from_queryset(Interviewee.all())
+    interviewees = await Interviewee.all().values(*interviewee_pydantic.model_fields)
+
+    return ORJSONResponse(interviewees)
 
 
 def create_email_body(interviewee):
@@ -129,6 +140,51 @@ def create_management_notification_message(interviewee):
     return message
 
 
+@router.post("/uploads/presign", name="Presign interviewee image uploads")
+async def presign_interviewee_uploads(upload_request: PresignUploadRequest):
+    # the browser uploads the images first, then sends the returned keys as
+    # img_key / residence_card_key in register_interviewee's data_json
+    uploads = []
+    for file in upload_request.files:
+        folder_path, _, max_size = interviewee_upload_kinds[file.kind]
+
+        if file.content_type not in ('image/jpeg', 'image/png'):
+            raise HTTPException(
+                status_code=400, detail=f"Invalid file type for {file.kind}: {file.content_type}")
+
+        if file.size > max_size:
+            raise HTTPException(
+                status_code=413, detail=f"{file.filename} is larger than {max_size // (1024 * 1024)} MB.")
+
+        extension = file.filename.rsplit('.', 1)[-1].lower() if '.' in file.filename else 'jpg'
+        s3_img_path = f"{folder_path}{uuid4().hex}.{extension}"
+
+        try:
+            presigned = await generate_presigned_upload_async(s3_img_path, file.content_type, max_size)
+        except PresignUnsupported as e:
+            raise HTTPException(status_code=501, detail=str(e))
+
+        uploads.append({"kind": file.kind, "key": s3_img_path,
+                        "url": presigned['url'], "fields": presigned['fields']})
+
+    return {"uploads": uploads}
+
+
+async def finalize_interviewee_uploads(details: dict):
+    # keys from /uploads/presign, checked against the bucket before they are recorded
+    for kind, key_field in (('interviewee_image', 'img_key'), ('residence_card_image', 'residence_card_key')):
+        s3_img_path = details.pop(key_field, None)
+        if not s3_img_path:
+            continue
+
+        folder_path, field, _ = interviewee_upload_kinds[kind]
+        if not s3_img_path.startswith(folder_path) or not await is_file_exists_async(s3_img_path):
+            raise HTTPException(
+                status_code=400, detail=f"{kind} was not uploaded.")
+
+        details[field] = media_url(s3_img_path)
+
+
 @router.post("/register_interviewee", name="Create interviewee")
 async def save_interviewee(data_json: str = Form(...), interviewee_image: UploadFile = File(None), residence_card_image: UploadFile = File(None)):
     try:
@@ -138,6 +194,8 @@ async def save_interviewee(data_json: str = Form(...), interviewee_image: Upload
         print("Interviewee Data Incorrect JSON Format: ", str(e))
         return JSONResponse(content={"Interviewee Data Incorrect JSON Format": str(e)}, status_code=400)
 
+    validate_uploads([image for image in (interviewee_image, residence_card_image) if image], image_types)
+
     # residence_card_number is unique, if it already exists, return an error
     residence_card_number = details['residence_card_number']
     exists = await Interviewee.filter(residence_card_number=residence_card_number).exists()
@@ -145,40 +203,33 @@ async def save_interviewee(data_json: str = Form(...), interviewee_image: Upload
         raise HTTPException(
             status_code=400, detail="Residence card number already exists.")
 
-    now = datetime.now()
-
-    if interviewee_image:
-        image_name = details['first_name'] + \
-            details['last_name'] + '_dp_' + \
-            now.strftime("_%Y%m%d_%H%M%S") + ".jpg"
-
-        upload_file_to_s3(interviewee_image, image_name,
-                          s3_interviewee_image_upload_folder)
-
-        s3_img_path = s3_interviewee_image_upload_folder + image_name
+    await finalize_interviewee_uploads(details)
 
-        s3_read_url = generate_s3_url(s3_img_path, 'read')
+    uploads = []
+    upload_fields = []
 
-        details['img_url'] = s3_read_url
-        print("Interviewee image uploaded successfully.")
+    if interviewee_image:
+        uploads.append((interviewee_image, s3_interviewee_image_upload_folder))
+        upload_fields.append('img_url')
 
     if residence_card_image:
-        image_name = details['first_name'] + \
-            details['last_name'] + '_residencecard_' + \
-            now.strftime("_%Y%m%d_%H%M%S") + ".jpg"
-
-        upload_file_to_s3(residence_card_image, image_name,
-                          s3_interviewee_rcimage_upload_folder)
-
-        s3_img_path = s3_interviewee_image_upload_folder + image_name
+        uploads.append((residence_card_image, s3_interviewee_rcimage_upload_folder))
+        upload_fields.append('residence_card_image')
 
-        s3_read_url = generate_s3_url(s3_img_path, 'read')
+    try:
+        uploaded_keys, stored_files = await store_files_async(uploads)
+    except Exception as e:
+        print("Interviewee image upload failed: ", str(e))
+        raise HTTPException(
+            status_code=502, detail="There was an error uploading the images.")
 
-        details['residence_card_image'] = s3_read_url
-        print("Residence card image uploaded successfully.")
+    for field, s3_img_path in zip(upload_fields, uploaded_keys):
+        details[field] = media_url(s3_img_path)
+        print(f"Interviewee {field} uploaded successfully.")
 
     # save the interviewee
     interviewee = await Interviewee.create(**details)
+    await index_stored_files(stored_files)
 
     new_interviwee = await interviewee_pydantic.from_tortoise_orm(interviewee)
 
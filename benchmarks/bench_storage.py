@@ -0,0 +1,97 @@
+# upload throughput and latency against the local storage backend
+#
+# usage: python -m benchmarks.bench_storage [requests]
+#
+# runs the same code paths as create_applicant (content addressed photo and
+# video uploads in one parallel stage) and generate_document (filled docx and
+# static pdf copies) with STORAGE_BACKEND=local and an in-memory sqlite index,
+# so only the app side of the upload path is measured, no network.
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from tempfile import SpooledTemporaryFile
+from types import SimpleNamespace
+
+storage_root = tempfile.mkdtemp(prefix="bench_storage_")
+os.environ["STORAGE_BACKEND"] = "local"
+os.environ["STORAGE_LOCAL_ROOT"] = storage_root
+os.environ.setdefault("DB_URI", "sqlite://:memory:")
+
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+from tortoise import Tortoise
+
+from app.helpers.content_store import store_files_async
+from app.helpers.generate_docs import generate_default_documents, fill_recruitment_agreement
+from app.helpers.s3_file_upload import run_in_storage_executor
+
+photo_size = 2 * 1024 * 1024
+video_size = 40 * 1024 * 1024
+
+company = SimpleNamespace(
+    name_en="Bench Care Co., Ltd.", name_ja="ベンチ介護株式会社", building_en="1-2-3 Bench Bldg.",
+    building_ja="ベンチビル", municipality_town_en="Naka-ku", municipality_town_ja="中区",
+    prefecture_en="Kanagawa", prefecture_ja="神奈川県", street_address_ja="海岸通1-2-3",
+    rep_name_en="Taro Bench", rep_name_ja="ベンチ太郎", rep_position_en="President",
+    rep_position_ja="代表取締役", postal_code="231-0002", rep_email="rep@example.com")
+agency = SimpleNamespace(name="Bench Agency", address="Manila", rep_name="Juan Bench", rep_position="President")
+
+
+def make_upload(size: int, filename: str, content_type: str) -> UploadFile:
+    # fresh random content per file, otherwise the content store deduplicates them
+    file = SpooledTemporaryFile(max_size=1024 * 1024)
+    file.write(os.urandom(size))
+    file.seek(0)
+    return UploadFile(file=file, size=size, filename=filename, headers=Headers({"content-type": content_type}))
+
+
+async def timed(label: str, func, requests: int, nbytes: int = 0):
+    latencies = []
+    for _ in range(requests):
+        args = func.prepare() if hasattr(func, "prepare") else ()
+        start = time.perf_counter()
+        await func(*args)
+        latencies.append(time.perf_counter() - start)
+
+    total = sum(latencies)
+    p95 = sorted(latencies)[max(0, int(len(latencies) * 0.95) - 1)]
+    throughput = f"{nbytes * requests / total / 1024 / 1024:8.1f} MiB/s" if nbytes else ""
+    print(f"{label:<28} p50 {statistics.median(latencies) * 1000:8.1f} ms  "
+          f"p95 {p95 * 1000:8.1f} ms  {throughput}")
+
+
+def upload_stage(uploads):
+    async def run(*files):
+        await store_files_async([(file, upload[3]) for file, upload in zip(files, uploads)])
+
+    # files are built outside the timed section, only the upload stage is measured
+    run.prepare = lambda: [make_upload(*upload[:3]) for upload in uploads]
+    return run
+
+
+async def main(requests: int):
+    await Tortoise.init(db_url="sqlite://:memory:", modules={"models": ["app.models.stored_object"]})
+    await Tortoise.generate_schemas()
+
+    photos = [(photo_size, f"photo{i}.jpg", "image/jpeg", "uploads/applicant/photos/") for i in range(4)]
+    videos = [(video_size, "video.mp4", "video/mp4", "uploads/applicant/videos/")]
+
+    print(f"local storage under {storage_root}, {requests} requests each")
+    await timed("4 photos x 2 MiB", upload_stage(photos), requests, 4 * photo_size)
+    await timed("1 video x 40 MiB", upload_stage(videos), requests, video_size)
+    await timed("photos + video", upload_stage(photos + videos), requests, 4 * photo_size + video_size)
+
+    details = {"created_date": "", "visa_type": "psw"}
+    await timed("recruitment agreement docx",
+                lambda: run_in_storage_executor(fill_recruitment_agreement, company, agency, details), requests)
+    await timed("license copy pdf",
+                lambda: run_in_storage_executor(generate_default_documents, "aqium_license_copy", "initial"), requests)
+
+    await Tortoise.close_connections()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20))